@@ -19,6 +19,9 @@ a = Analysis(
         'openpyxl',
         'cryptography',
         'cryptography.fernet',
+        'orjson',
+        'python_calamine',
+        'pyarrow',
         'PIL',
         'PIL.ImageGrab',
         'src',
@@ -4,6 +4,7 @@ Application entry point
 
 import customtkinter as ctk
 from src.gui_main import FileToDBGUI
+from src.database import close_all
 
 # Set appearance mode and default color theme
 ctk.set_appearance_mode("Light")  # Changed to Light mode for better visibility
@@ -15,6 +16,8 @@ def main():
     root = ctk.CTk()
     app = FileToDBGUI(root)
     root.mainloop()
+    # Log out any connections still held open for reuse
+    close_all()
 
 
 if __name__ == "__main__":
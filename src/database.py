@@ -2,50 +2,126 @@
 Database operations and connection management
 """
 
-import pyodbc
+import contextlib
+import csv
+import itertools
 import json
+import os
+import re
+import tempfile
+import threading
 import pandas as pd
+try:
+    import orjson
+except ImportError:  # optional, faster JSON parsing
+    orjson = None
 from .utils import decrypt_password, logger
-from .file_processor import infer_column_type
+from .file_processor import infer_dataframe_types, infer_column_types, iter_prefetched, spool_chunks, iter_spooled_chunks
+
+_pyodbc = None
+
+def load_pyodbc():
+    """
+    Import pyodbc on first use rather than at startup, since importing it loads
+    the ODBC driver manager. Python caches the import, so later calls are cheap.
+    """
+    global _pyodbc
+    if _pyodbc is None:
+        import pyodbc
+        _pyodbc = pyodbc
+    return _pyodbc
+
+# Idle connections kept open for reuse, keyed by connection string, and the
+# key each connection handed out by get_db_connection was opened with
+MAX_IDLE_CONNECTIONS = 4
+_idle_connections = {}
+_connection_keys = {}
+_pool_lock = threading.Lock()
+
+# Parsed config.json and the modification time it was read at
+_config_cache = {'mtime': None, 'data': None}
+
+def _load_config():
+    """Return the parsed config.json, re-reading it only when the file has changed"""
+    mtime = os.stat('config.json').st_mtime_ns
+    if _config_cache['mtime'] != mtime:
+        with open('config.json', 'rb') as config_file:
+            data = config_file.read()
+        _config_cache['data'] = orjson.loads(data) if orjson else json.loads(data)
+        _config_cache['mtime'] = mtime
+    return _config_cache['data']
+
+def clear_config_cache():
+    """Forget the cached config.json so the next lookup reads the file again"""
+    _config_cache['mtime'] = None
+    _config_cache['data'] = None
+
+def get_connection_config(connection_name=None):
+    """
+    Get the settings of one connection from config.json
+
+    Args:
+        connection_name: Name of the connection (default: the configured default connection)
+    """
+    config = _load_config()
+
+    # Support both old and new config formats
+    if 'connections' in config:
+        # New format with multiple connections
+        if connection_name is None:
+            connection_name = config.get('default_connection', list(config['connections'].keys())[0])
+
+        if connection_name not in config['connections']:
+            raise ValueError(f"Connection '{connection_name}' not found in config.json")
+
+        logger.info(f"Using connection: {connection_name}")
+        return config['connections'][connection_name]
+
+    # Old format with single connection
+    logger.debug("Using legacy config format (single connection)")
+    return config
+
+# Keywords of the connection string fields, in the order they are written
+_CONN_STR_KEYS = ('DRIVER', 'SERVER', 'DATABASE', 'UID', 'PWD')
+
+def _conn_str_value(key, value):
+    """Brace a connection string value that contains ';', braces or edge spaces ('}' is doubled)"""
+    if key == 'DRIVER' and value.startswith('{') and value.endswith('}'):
+        return value  # drivers are configured already braced, e.g. {ODBC Driver 17 for SQL Server}
+    if any(ch in value for ch in ';{}') or value != value.strip():
+        return '{' + value.replace('}', '}}') + '}'
+    return value
+
+def build_connection_string(driver, server, database, username, password):
+    """
+    Build an ODBC connection string, bracing values that would otherwise break it
+    (e.g. a password containing ';')
+
+    Args:
+        driver: ODBC driver name, e.g. {ODBC Driver 17 for SQL Server}
+        server: Server name
+        database: Database name
+        username: Login name
+        password: Plain-text password
+    """
+    values = (driver, server, database, username, password)
+    return ''.join(f'{key}={_conn_str_value(key, value)};' for key, value in zip(_CONN_STR_KEYS, values))
 
 def get_db_connection(connection_name=None):
     """Get database connection using config from config.json"""
     logger.info("Connecting to database...")
     try:
-        with open('config.json') as config_file:
-            config = json.load(config_file)
-
-        # Support both old and new config formats
-        if 'connections' in config:
-            # New format with multiple connections
-            if connection_name is None:
-                connection_name = config.get('default_connection', list(config['connections'].keys())[0])
-
-            if connection_name not in config['connections']:
-                raise ValueError(f"Connection '{connection_name}' not found in config.json")
-
-            db_config = config['connections'][connection_name]
-            logger.info(f"Using connection: {connection_name}")
-        else:
-            # Old format with single connection
-            db_config = config
-            logger.debug("Using legacy config format (single connection)")
+        db_config = get_connection_config(connection_name)
 
         logger.debug(f"Database server: {db_config['server']}, Database: {db_config['database']}")
 
         # Decrypt password if encrypted
         password = decrypt_password(db_config.get("password", ""))
 
-        conn_str = (
-            f'DRIVER={db_config["driver"]};'
-            f'SERVER={db_config["server"]};'
-            f'DATABASE={db_config["database"]};'
-            f'UID={db_config["username"]};'
-            f'PWD={password};'
+        conn_str = build_connection_string(
+            db_config["driver"], db_config["server"], db_config["database"], db_config["username"], password
         )
-        conn = pyodbc.connect(conn_str)
-        logger.info("Database connection established successfully")
-        return conn
+        return open_connection(conn_str)
     except FileNotFoundError:
         logger.error("config.json file not found")
         raise
@@ -53,11 +129,104 @@ def get_db_connection(connection_name=None):
         logger.error(f"Failed to connect to database: {e}")
         raise
 
+def open_connection(conn_str, timeout=0):
+    """
+    Return a live pooled connection for a connection string, or open a new one.
+    Hand it back with release_connection when done.
+
+    Args:
+        conn_str: ODBC connection string
+        timeout: Login timeout in seconds for a new connection (0 = driver default)
+    """
+    conn = _checkout_connection(conn_str)
+    if conn is not None:
+        logger.info("Reusing pooled database connection")
+        return conn
+
+    conn = load_pyodbc().connect(conn_str, timeout=timeout)
+    with _pool_lock:
+        # pyodbc connections can't be weakly referenced, so drop the keys of
+        # connections that were closed directly instead of being released
+        for closed in [c for c in _connection_keys if c.closed]:
+            del _connection_keys[closed]
+        _connection_keys[conn] = conn_str
+    logger.info("Database connection established successfully")
+    return conn
+
+def _discard_connection(conn):
+    """Close a connection without putting it back in the pool"""
+    with _pool_lock:
+        _connection_keys.pop(conn, None)
+    try:
+        conn.close()
+    except load_pyodbc().Error:
+        pass
+
+def _checkout_connection(conn_str):
+    """
+    Take an idle pooled connection for this connection string, if a live one exists
+
+    Args:
+        conn_str: ODBC connection string the connection was opened with
+    """
+    while True:
+        with _pool_lock:
+            idle = _idle_connections.get(conn_str)
+            conn = idle.pop() if idle else None
+        if conn is None:
+            return None
+
+        # The server may have dropped the session while it sat idle
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT 1").fetchall()
+            cursor.close()
+            return conn
+        except load_pyodbc().Error as e:
+            logger.debug(f"Discarding stale pooled connection: {e}")
+            _discard_connection(conn)
+
+def release_connection(conn):
+    """
+    Hand a connection from get_db_connection or open_connection back to the pool instead of closing it
+
+    Any open transaction is rolled back first, so callers must commit before releasing.
+
+    Args:
+        conn: Connection returned by get_db_connection
+    """
+    with _pool_lock:
+        conn_str = _connection_keys.get(conn)
+
+    if conn_str is not None:
+        try:
+            conn.rollback()
+            conn.autocommit = False
+        except load_pyodbc().Error:
+            conn_str = None
+
+    if conn_str is not None:
+        with _pool_lock:
+            idle = _idle_connections.setdefault(conn_str, [])
+            if len(idle) < MAX_IDLE_CONNECTIONS:
+                idle.append(conn)
+                return
+
+    _discard_connection(conn)
+
+def close_all():
+    """Close every idle pooled connection (call on shutdown)"""
+    with _pool_lock:
+        idle = [conn for conns in _idle_connections.values() for conn in conns]
+        _idle_connections.clear()
+    for conn in idle:
+        _discard_connection(conn)
+    logger.debug(f"Closed {len(idle)} pooled connection(s)")
+
 def get_available_connections():
     """Get list of available connection names from config"""
     try:
-        with open('config.json') as config_file:
-            config = json.load(config_file)
+        config = _load_config()
 
         if 'connections' in config:
             return list(config['connections'].keys())
@@ -66,7 +235,25 @@ def get_available_connections():
     except FileNotFoundError:
         return []
 
-def create_table_from_dataframe(df, table_name, cursor, column_name_map=None, column_type_map=None):
+# Table names accepted by create_table_from_dataframe
+_TABLE_NAME_RE = re.compile(r'[A-Za-z_][A-Za-z0-9_ ]*')
+
+def quote_identifier(name):
+    """Quote a SQL Server identifier with brackets, escaping any closing bracket"""
+    return '[' + name.replace(']', ']]') + ']'
+
+# Number of rows sent per executemany call
+INSERT_CHUNK_SIZE = 10000
+
+# SQL Server limits for a single statement, used by the multi-row INSERT fallback
+MAX_STATEMENT_PARAMS = 2100
+MAX_VALUES_ROWS = 1000
+
+# Rows loaded with executemany before load_table_from_chunks switches to BULK INSERT
+BULK_INSERT_MIN_ROWS = 50000
+
+def create_table_from_dataframe(df, table_name, cursor, column_name_map=None, column_type_map=None, insert_rows=True,
+                                chunk_size=INSERT_CHUNK_SIZE):
     """
     Create table from dataframe with optional column name and type overrides.
 
@@ -76,12 +263,42 @@ def create_table_from_dataframe(df, table_name, cursor, column_name_map=None, co
         cursor: Database cursor
         column_name_map: Dict mapping original column names to new names (optional)
         column_type_map: Dict mapping column names to SQL types (optional)
+        insert_rows: If True, insert the rows and commit. If False, only create the
+            table and return (insert_sql, columns, column_types) so the caller can
+            load the data with insert_dataframe inside its own transaction.
+        chunk_size: Number of rows per executemany call when insert_rows is True
     """
+    if insert_rows:
+        # Drop, create and load in one transaction that is committed once at the end,
+        # then put the connection's own autocommit setting back
+        conn = cursor.connection
+        previous_autocommit = conn.autocommit
+        conn.autocommit = False
+        try:
+            insert_sql, columns, column_types = create_table_from_dataframe(
+                df, table_name, cursor, column_name_map, column_type_map, insert_rows=False
+            )
+            insert_dataframe(df, insert_sql, cursor, columns, chunk_size, column_types=column_types)
+            conn.commit()
+        except Exception as e:
+            logger.error(f"Failed to load table '{table_name}', rolling back: {e}")
+            conn.rollback()
+            raise
+        finally:
+            conn.autocommit = previous_autocommit
+        logger.info(f"Committed transaction for table '{table_name}'")
+        return
+
     logger.info(f"Creating table: {table_name}")
 
+    if not _TABLE_NAME_RE.fullmatch(table_name):
+        logger.error(f"Invalid table name: '{table_name}'")
+        raise ValueError(f"Invalid table name: '{table_name}'")
+    safe_table_name = quote_identifier(table_name)
+
     # Drop table if it exists
     logger.debug(f"Checking if table '{table_name}' already exists")
-    cursor.execute(f"IF OBJECT_ID('{table_name}', 'U') IS NOT NULL DROP TABLE {table_name}")
+    cursor.execute(f"IF OBJECT_ID(?, 'U') IS NOT NULL DROP TABLE {safe_table_name}", safe_table_name)
 
     # Initialize override maps if not provided
     if column_name_map is None:
@@ -92,8 +309,9 @@ def create_table_from_dataframe(df, table_name, cursor, column_name_map=None, co
     # Analyze each column to determine the best type
     logger.info("Analyzing column types...")
     sql_columns = []
-    column_types = {}
     final_column_names = {}  # Map original to final column names
+    column_types = {}  # Map original column names to SQL types
+    detected_types = infer_dataframe_types(df, [c for c in df.columns if c not in column_type_map])
 
     for column_name in df.columns:
         # Get final column name (use override if provided, otherwise use original)
@@ -105,45 +323,285 @@ def create_table_from_dataframe(df, table_name, cursor, column_name_map=None, co
             col_type = column_type_map[column_name]
             logger.debug(f"Using overridden type for '{column_name}': {col_type}")
         else:
-            col_type = infer_column_type(df[column_name], column_name)
-
+            col_type = detected_types[column_name]
         column_types[column_name] = col_type
-        sql_columns.append(f"[{final_col_name}] {col_type}")
+
+        sql_columns.append(f"{quote_identifier(final_col_name)} {col_type}")
 
         if final_col_name != column_name:
             logger.info(f"Column renamed: '{column_name}' -> '{final_col_name}'")
 
-    create_table_sql = f"CREATE TABLE {table_name} ({', '.join(sql_columns)})"
+    create_table_sql = f"CREATE TABLE {safe_table_name} ({', '.join(sql_columns)})"
     logger.info(f"Table schema: {create_table_sql}")
     cursor.execute(create_table_sql)
     logger.info(f"Table '{table_name}' created successfully")
 
-    # Insert data with proper type handling
+    # Single parameterized INSERT reused for every row
+    columns = list(df.columns)
+    placeholders = ', '.join(['?'] * len(columns))
+    target_columns = ', '.join(quote_identifier(final_column_names[c]) for c in columns)
+    insert_sql = f"INSERT INTO {safe_table_name} ({target_columns}) VALUES ({placeholders})"
+
+    return insert_sql, columns, column_types
+
+def _bind_numeric_columns(chunk, column_types):
+    """
+    Parse text columns loaded into BIGINT/FLOAT columns so pyodbc binds numbers
+    instead of strings that the server has to convert row by row. A column is
+    left as text if any value doesn't parse (e.g. a forced type that doesn't fit),
+    so the server still reports the conversion error.
+    """
+    converted = {}
+    for col, sql_type in column_types.items():
+        if sql_type not in ('BIGINT', 'FLOAT') or col not in chunk.columns:
+            continue
+        series = chunk[col]
+        if series.dtype.kind in 'iufb':
+            continue
+        numbers = pd.to_numeric(series, errors='coerce', dtype_backend='numpy_nullable')
+        if numbers.isna().sum() != series.isna().sum():
+            continue
+        if sql_type == 'BIGINT' and numbers.dtype.kind not in 'iu':
+            continue
+        converted[col] = numbers
+    return chunk.assign(**converted) if converted else chunk
+
+def insert_dataframe(df, insert_sql, cursor, columns=None, chunk_size=INSERT_CHUNK_SIZE, fast_executemany=True,
+                     column_types=None):
+    """
+    Insert dataframe rows using a single parameterized INSERT statement.
+
+    Rows are sent with cursor.executemany in chunks of chunk_size rows, so the
+    statement is prepared once per table instead of once per row. The caller is
+    responsible for committing the transaction.
+
+    Args:
+        df: DataFrame holding the rows to insert
+        insert_sql: Parameterized INSERT statement (as returned by create_table_from_dataframe)
+        cursor: Database cursor
+        columns: Column order matching the INSERT placeholders (default: df.columns)
+        chunk_size: Number of rows per executemany call
+        fast_executemany: If False (e.g. for drivers without array binding), rows are
+            sent as multi-row INSERT ... VALUES (...), (...) statements instead
+        column_types: Dict mapping column names to SQL types (as returned by
+            create_table_from_dataframe); BIGINT/FLOAT text columns are bound as numbers
+    """
+    if columns is not None:
+        df = df[columns]
+
     total_rows = len(df)
-    logger.info(f"Inserting {total_rows} rows...")
-
-    for idx, row in df.iterrows():
-        values = []
-        for col_name, v in zip(df.columns, row.values):
-            if pd.isna(v):
-                values.append("NULL")
-            elif column_types[col_name] in ["BIGINT", "FLOAT"]:
-                # Insert numeric values without quotes
-                values.append(str(v))
-            else:
-                # Insert strings with proper escaping
-                escaped_value = str(v).replace("'", "''")
-                values.append(f"'{escaped_value}'")
-        insert_sql = f"INSERT INTO {table_name} VALUES ({', '.join(values)})"
+    logger.info(f"Inserting {total_rows} rows in chunks of {chunk_size}...")
+
+    # Send each chunk as one array-bound batch instead of one round-trip per row
+    cursor.fast_executemany = fast_executemany
+
+    for start in range(0, total_rows, chunk_size):
+        chunk = df.iloc[start:start + chunk_size]
+        if column_types:
+            chunk = _bind_numeric_columns(chunk, column_types)
+        # pyodbc binds None as NULL
+        chunk = chunk.astype(object).where(chunk.notna(), None)
+        rows = list(chunk.itertuples(index=False, name=None))
+        if fast_executemany:
+            cursor.executemany(insert_sql, rows)
+        else:
+            _execute_multi_row(cursor, insert_sql, rows, len(df.columns))
+        logger.debug(f"Inserted {min(start + chunk_size, total_rows)}/{total_rows} rows")
+
+    logger.info(f"Successfully inserted all {total_rows} rows")
+
+def _execute_multi_row(cursor, insert_sql, rows, num_columns):
+    """Insert rows with multi-row INSERT ... VALUES (...), (...) statements within SQL Server's limits"""
+    prefix, row_placeholders = insert_sql.rsplit(' VALUES ', 1)
+    batch_size = max(1, min(MAX_VALUES_ROWS, (MAX_STATEMENT_PARAMS - 1) // max(num_columns, 1)))
+    # Full batches share one statement text, so the driver can reuse its prepared plan
+    statements = {}
+    for start in range(0, len(rows), batch_size):
+        batch = rows[start:start + batch_size]
+        if len(batch) not in statements:
+            statements[len(batch)] = f"{prefix} VALUES {', '.join([row_placeholders] * len(batch))}"
+        cursor.execute(statements[len(batch)], [value for row in batch for value in row])
+
+def bulk_insert_chunks(chunks, table_name, cursor, stage_dir, columns=None):
+    """
+    Load DataFrame chunks into an existing table with BULK INSERT from a staged TSV file.
+
+    The rows are written to a tab-separated file in stage_dir, which must be a
+    directory that both this machine and the SQL Server service can read at the
+    same path (e.g. a UNC share), and loaded server-side in a single statement.
+    The caller is responsible for committing the transaction.
 
+    Args:
+        chunks: Iterable of DataFrame chunks (same columns in each, in table column order)
+        table_name: Name of the (already created) table to load
+        cursor: Database cursor
+        stage_dir: Directory to write the staging file to
+        columns: Column order of the table (default: each chunk's columns)
+
+    Raises:
+        OSError: If the staging file cannot be written
+        csv.Error: If a value contains a tab or line break, which TSV cannot represent
+        ValueError: If the server loaded a different number of rows than were staged
+    """
+    safe_table_name = quote_identifier(table_name)
+    fd, stage_path = tempfile.mkstemp(suffix='.tsv', prefix=f"{table_name}_", dir=stage_dir)
+    try:
+        total_rows = 0
+        with os.fdopen(fd, 'w', encoding='utf-8', newline='') as stage_file:
+            for chunk in chunks:
+                if columns is not None:
+                    chunk = chunk[columns]
+                # BULK INSERT without FORMAT = 'CSV' has no quoting or escaping, so a
+                # tab or line break inside a value would split the row
+                for column in chunk.columns:
+                    values = chunk[column]
+                    if pd.api.types.is_string_dtype(values.dtype) and \
+                            values.str.contains(r'[\t\n]', regex=True, na=False).any():
+                        raise csv.Error(f"Column '{column}' has values with tabs or line breaks, "
+                                        "which a BULK INSERT data file cannot hold")
+                # Empty fields are loaded as NULL (KEEPNULLS)
+                chunk.to_csv(stage_file, sep='\t', header=False, index=False, na_rep='',
+                             quoting=csv.QUOTE_NONE, lineterminator='\n')
+                total_rows += len(chunk)
+
+        logger.info(f"Bulk inserting {total_rows} rows into '{table_name}' from {stage_path}")
+        escaped_path = stage_path.replace("'", "''")
+        # CODEPAGE = '65001' (a UTF-8 data file) needs SQL Server 2016 or later; see _try_bulk_insert
+        # MAXERRORS = 0: fail on the first row that doesn't convert, like executemany
+        # does, instead of skipping up to 10 bad rows (SQL Server's default)
+        cursor.execute(
+            f"BULK INSERT {safe_table_name} FROM '{escaped_path}' "
+            "WITH (FIELDTERMINATOR = '\\t', ROWTERMINATOR = '0x0a', CODEPAGE = '65001', KEEPNULLS, TABLOCK, "
+            "MAXERRORS = 0)"
+        )
+        # rowcount is -1 when the server doesn't report it (e.g. SET NOCOUNT ON)
+        if cursor.rowcount != -1 and cursor.rowcount != total_rows:
+            logger.error(f"Bulk insert into '{table_name}' loaded {cursor.rowcount} of {total_rows} rows")
+            raise ValueError(f"Bulk insert into '{table_name}' loaded {cursor.rowcount} of {total_rows} rows")
+        logger.info(f"Successfully bulk inserted all {total_rows} rows")
+    finally:
         try:
-            cursor.execute(insert_sql)
-            if (idx + 1) % 100 == 0:
-                logger.debug(f"Inserted {idx + 1}/{total_rows} rows")
-        except Exception as e:
-            logger.error(f"Failed to insert row {idx + 1}: {e}")
-            logger.debug(f"SQL: {insert_sql}")
+            os.remove(stage_path)
+        except OSError as e:
+            logger.warning(f"Could not remove staging file {stage_path}: {e}")
+
+def _try_bulk_insert(get_chunks, table_name, cursor, stage_dir, columns):
+    """Run bulk_insert_chunks inside a savepoint; return False (nothing loaded) if it fails"""
+    # UTF-8 data files (CODEPAGE = '65001') are supported from SQL Server 2016 (version 13)
+    cursor.execute("SELECT CAST(SERVERPROPERTY('ProductVersion') AS nvarchar(128))")
+    version = cursor.fetchone()[0] or ''
+    if int(version.split('.')[0] or 0) < 13:
+        logger.warning(f"Bulk insert into '{table_name}' needs SQL Server 2016 or later (server version "
+                       f"{version or 'unknown'}), using executemany instead")
+        return False
+
+    cursor.execute("SAVE TRANSACTION bulk_load")
+    try:
+        bulk_insert_chunks(get_chunks(), table_name, cursor, stage_dir, columns)
+        return True
+    except (OSError, csv.Error, load_pyodbc().Error) as e:
+        # Some server errors doom or end the transaction (XACT_STATE() -1 or 0); the
+        # savepoint is gone then, and the load can only fail with the original error
+        try:
+            cursor.execute("SELECT XACT_STATE()")
+            transaction_usable = cursor.fetchone()[0] == 1
+        except load_pyodbc().Error:
+            transaction_usable = False
+        if not transaction_usable:
+            logger.error(f"Bulk insert into '{table_name}' failed and ended the transaction: {e}")
             raise
+        logger.warning(f"Bulk insert into '{table_name}' not possible, using executemany instead: {e}")
+        cursor.execute("ROLLBACK TRANSACTION bulk_load")
+        return False
+
+def load_table_from_chunks(get_chunks, table_name, cursor, column_name_map=None, column_type_map=None,
+                           chunk_size=INSERT_CHUNK_SIZE, stage_dir=None, fast_executemany=True, spool=True):
+    """
+    Create a table and load it from a stream of DataFrame chunks.
+
+    Column types are inferred over the whole stream first (columns with a type
+    override are skipped), then the rows are inserted from a second pass. With
+    spool=True the source is read only once: each chunk is also written to a spool
+    file in stage_dir (or the system temp directory), which the second pass reads.
+    Only the chunk being inserted and the one read ahead are held in memory. The
+    caller is responsible for committing the transaction.
+
+    Args:
+        get_chunks: Callable returning a new iterator of DataFrame chunks. Later chunks
+            may add columns at the end (see iter_excel_chunks); earlier rows get NULLs.
+        table_name: Name of the table to create
+        cursor: Database cursor
+        column_name_map: Dict mapping original column names to new names (optional)
+        column_type_map: Dict mapping column names to SQL types (optional)
+        chunk_size: Number of rows per executemany call
+        stage_dir: Optional directory shared with SQL Server. If set, rows past the
+            first BULK_INSERT_MIN_ROWS are loaded with bulk_insert_chunks, falling
+            back to executemany when the rows cannot be staged or the server cannot
+            read the file. Smaller sheets always use executemany.
+        fast_executemany: Passed to insert_dataframe (False selects multi-row INSERTs)
+        spool: Spool the chunks instead of calling get_chunks again for the inserts;
+            worth it when the source is slow to parse (Excel), not for CSV files
+    """
+    column_types = dict(column_type_map or {})
+    # Track the widest column list seen while the types are inferred
+    final_columns = []
+
+    def track_columns(chunks):
+        for chunk in chunks:
+            if len(chunk.columns) > len(final_columns):
+                final_columns[:] = chunk.columns
+            yield chunk
+
+    if not spool:
+        column_types.update(infer_column_types(track_columns(get_chunks()), column_types))
+        _insert_chunks(lambda: _iter_widened(get_chunks(), final_columns), table_name, cursor, column_name_map,
+                       column_types, chunk_size, stage_dir, fast_executemany)
+        return
+
+    fd, spool_path = tempfile.mkstemp(suffix='.pkl', prefix=f"{table_name}_", dir=stage_dir)
+    os.close(fd)
+    try:
+        column_types.update(infer_column_types(track_columns(spool_chunks(get_chunks(), spool_path)), column_types))
+        logger.info(f"Spooled '{table_name}' to {spool_path} ({os.path.getsize(spool_path) / 1e6:.1f} MB)")
+        _insert_chunks(lambda: iter_spooled_chunks(spool_path, final_columns), table_name, cursor, column_name_map,
+                       column_types, chunk_size, stage_dir, fast_executemany)
+    finally:
+        try:
+            os.remove(spool_path)
+        except OSError as e:
+            logger.warning(f"Could not remove spool file {spool_path}: {e}")
+
+def _iter_widened(chunks, columns):
+    """Yield chunks reindexed to columns (the columns a chunk lacks become NULL)"""
+    for chunk in chunks:
+        if list(chunk.columns) != columns:
+            chunk = chunk.reindex(columns=columns)
+        yield chunk
+
+def _insert_chunks(get_chunks, table_name, cursor, column_name_map, column_types, chunk_size, stage_dir,
+                   fast_executemany):
+    """Create the table from the first chunk and insert every chunk (see load_table_from_chunks)"""
+    insert_sql = None
+    rows_inserted = 0
+    # Read the next chunk while the current one is being inserted
+    with contextlib.closing(iter_prefetched(get_chunks())) as chunks:
+        for chunks_inserted, chunk in enumerate(chunks):
+            if insert_sql is None:
+                insert_sql, columns, column_types = create_table_from_dataframe(
+                    chunk, table_name, cursor, column_name_map, column_types, insert_rows=False
+                )
+            if stage_dir and rows_inserted >= BULK_INSERT_MIN_ROWS:
+                # Large sheet: bulk-load this chunk and the rest of the stream
+                if not _try_bulk_insert(lambda: itertools.chain([chunk], chunks), table_name, cursor, stage_dir,
+                                        columns):
+                    # The stream was partly consumed by the failed attempt, so read it again
+                    for remaining in itertools.islice(get_chunks(), chunks_inserted, None):
+                        insert_dataframe(remaining, insert_sql, cursor, columns, chunk_size, fast_executemany,
+                                         column_types)
+                return
+            insert_dataframe(chunk, insert_sql, cursor, columns, chunk_size, fast_executemany, column_types)
+            rows_inserted += len(chunk)
 
-    cursor.commit()
-    logger.info(f"Successfully inserted all {total_rows} rows and committed transaction")
+    if insert_sql is None:
+        logger.error(f"No columns found for table '{table_name}'")
+        raise ValueError(f"No columns found for table '{table_name}'")
@@ -3,15 +3,71 @@ Connection Manager Dialog - Manage database connections
 """
 
 import tkinter as tk
-from tkinter import messagebox
+from tkinter import ttk, messagebox
 import customtkinter as ctk
+import hashlib
 import json
+import logging
+import math
+import os
+import re
+import socket
+import tempfile
 import threading
-from src.database import get_available_connections
-from src.utils import encrypt_password, decrypt_password
+import time
+try:
+    import orjson
+except ImportError:  # optional, faster JSON parsing/serialization
+    orjson = None
+from src.database import (get_available_connections, clear_config_cache, build_connection_string, load_pyodbc,
+                          open_connection, release_connection)
+from src.utils import encrypt_password, decrypt_password, logger
+
+
+# Classifies connection errors in one pass. The driver group matches the driver
+# manager's "not found" errors, not the "[ODBC Driver 17 for SQL Server]" prefix
+# that every SQL Server error message carries.
+_CONNECTION_ERROR_RE = re.compile(
+    r"(?P<driver>IM002|Data source name not found|Can't open lib)"
+    r"|(?P<auth>Login failed|Login timeout)"
+    r"|(?P<network>Could not open a connection)"
+)
+
+
+def _tcp_endpoint(server):
+    """
+    Return (host, port) for a server given as "host,port", or None when it can't
+    be probed directly. Named instances and LocalDB get their port from the SQL
+    Server Browser service, np:/lpc: use other transports, and a bare name may be
+    a client-side alias or be reached through shared memory or named pipes.
+
+    Args:
+        server: Server value as entered in the connection form
+    """
+    server = server.strip()
+    if server.lower().startswith('tcp:'):
+        server = server[4:]
+    host, _, port = server.partition(',')
+    host = host.strip()
+    if not host or not port.strip() or host == '.' or host.startswith('(') or '\\' in host or ':' in host:
+        return None
+    try:
+        return host, int(port)
+    except ValueError:
+        return None
 
 
 class ConnectionManagerDialog:
+    # Seconds allowed for a connection test (port check and login) before it is reported as failed
+    TEST_LOGIN_TIMEOUT = 10
+    # Seconds allowed for the TCP port check that runs before the login
+    TEST_PREFLIGHT_TIMEOUT = 2
+    # Milliseconds to wait for further clicks before filling the form with the selection
+    SELECT_DEBOUNCE_MS = 120
+    # Button colors for the selected and unselected connection
+    SELECTED_COLORS = {"fg_color": ("#3a7ebf", "#1f538d"), "text_color": ("white", "white")}
+    UNSELECTED_COLORS = {"fg_color": "transparent", "text_color": ("gray10", "gray90")}
+
     def __init__(self, parent, main_app):
         self.main_app = main_app
         self.dialog = ctk.CTkToplevel(parent)
@@ -42,13 +98,21 @@ class ConnectionManagerDialog:
 
         ctk.CTkLabel(list_frame, text="Connections", font=ctk.CTkFont(size=13, weight="bold")).grid(row=0, column=0, columnspan=2, sticky=tk.W, padx=10, pady=(10, 5))
 
-        # Use CTkTextbox for connection list (styled like listbox)
-        self.conn_textbox = ctk.CTkTextbox(list_frame, height=300, width=200, font=ctk.CTkFont(size=11))
-        self.conn_textbox.grid(row=1, column=0, sticky=(tk.W, tk.E, tk.N, tk.S), padx=10, pady=(0, 10))
-        self.conn_textbox.bind("<Button-1>", self._on_connection_click)
+        # One button per connection; selecting recolors two buttons instead of redrawing the list
+        self.conn_list_frame = ctk.CTkScrollableFrame(list_frame, height=300, width=200)
+        self.conn_list_frame.grid(row=1, column=0, sticky=(tk.W, tk.E, tk.N, tk.S), padx=10, pady=(0, 10))
+        self.conn_buttons = []
+        self._conn_button_font = ctk.CTkFont(size=11)
 
         # Store selection
         self.selected_connection_index = None
+        # Pending after() id of the debounced form update
+        self._select_after = None
+        # True while a connection test is running on the worker pool
+        self._test_running = False
+        # Load pyodbc (and the ODBC driver manager) in the background now, so the
+        # first Test click doesn't wait for it; an import error surfaces on Test
+        self.main_app.executor.submit(load_pyodbc)
 
         # Buttons for list
         list_btn_frame = ctk.CTkFrame(list_frame, fg_color="transparent")
@@ -115,31 +179,69 @@ class ConnectionManagerDialog:
         self.refresh_list()
 
     def _update_connection_list_display(self):
-        """Update the connection textbox display"""
-        self.conn_textbox.configure(state='normal')
-        self.conn_textbox.delete("1.0", tk.END)
+        """Sync the connection buttons with connection_names, creating or destroying only the difference"""
         for i, conn_name in enumerate(self.connection_names):
-            prefix = "▶ " if i == self.selected_connection_index else "  "
-            self.conn_textbox.insert(tk.END, f"{prefix}{conn_name}\n")
-        self.conn_textbox.configure(state='disabled')
-
-    def _on_connection_click(self, event):
-        """Handle click on connection textbox"""
-        try:
-            index = self.conn_textbox.index(f"@{event.x},{event.y}")
-            line_num = int(index.split('.')[0]) - 1
-            if 0 <= line_num < len(self.connection_names):
-                self.selected_connection_index = line_num
-                self._update_connection_list_display()
-                self.on_connection_select()
-        except:
-            pass
+            colors = self.SELECTED_COLORS if i == self.selected_connection_index else self.UNSELECTED_COLORS
+            if i < len(self.conn_buttons):
+                self.conn_buttons[i].configure(text=conn_name, **colors)
+            else:
+                self._append_connection_button(conn_name, colors)
+        for button in self.conn_buttons[len(self.connection_names):]:
+            button.destroy()
+        del self.conn_buttons[len(self.connection_names):]
+
+    def _append_connection_button(self, conn_name, colors):
+        """Add a button for a connection at the end of the list"""
+        i = len(self.conn_buttons)
+        button = ctk.CTkButton(self.conn_list_frame, text=conn_name, anchor="w", height=26,
+                               font=self._conn_button_font, hover_color=("gray75", "gray30"),
+                               command=lambda i=i: self._on_connection_click(i), **colors)
+        button.pack(fill=tk.X, pady=1)
+        self.conn_buttons.append(button)
+
+    def _remove_connection_button(self, index):
+        """Remove one connection from the list without rebuilding the other buttons"""
+        if self.selected_connection_index == index:
+            self.selected_connection_index = None
+        elif self.selected_connection_index is not None and self.selected_connection_index > index:
+            self.selected_connection_index -= 1
+        del self.connection_names[index]
+        self.conn_buttons.pop(index).destroy()
+        # Buttons below the removed one moved up by one
+        for i in range(index, len(self.conn_buttons)):
+            self.conn_buttons[i].configure(command=lambda i=i: self._on_connection_click(i))
+
+    def _move_selection_marker(self, new_index):
+        """Recolor only the previously and newly selected buttons"""
+        old_index = self.selected_connection_index
+        self.selected_connection_index = new_index
+        for i, colors in ((old_index, self.UNSELECTED_COLORS), (new_index, self.SELECTED_COLORS)):
+            if i is not None and i < len(self.conn_buttons):
+                self.conn_buttons[i].configure(**colors)
+
+    def _on_connection_click(self, index):
+        """Handle click on a connection button"""
+        # Re-clicking the selected connection changes nothing
+        if index != self.selected_connection_index and index < len(self.connection_names):
+            self._move_selection_marker(index)
+            # The highlight moves right away; the form is only filled for the last of
+            # several rapid clicks
+            if self._select_after is not None:
+                self.dialog.after_cancel(self._select_after)
+            self._select_after = self.dialog.after(self.SELECT_DEBOUNCE_MS, self._on_select_settled)
+
+    def _on_select_settled(self):
+        """Fill the form once the selection has stopped changing"""
+        self._select_after = None
+        if self.dialog.winfo_exists():
+            self.on_connection_select()
 
     def load_config(self):
         """Load config from file"""
         try:
-            with open('config.json', 'r') as f:
-                self.config = json.load(f)
+            with open('config.json', 'rb') as f:
+                data = f.read()
+                self.config = orjson.loads(data) if orjson else json.loads(data)
                 # Ensure new format
                 if 'connections' not in self.config:
                     # Convert old format to new
@@ -151,19 +253,52 @@ class ConnectionManagerDialog:
                         }
                     }
                     self.main_app.log_message("Converted legacy config format to new format", "INFO")
-                self.main_app.log_message(f"Loaded config with {len(self.config.get('connections', {}))} connection(s)", "INFO")
+                    # The converted config differs from the file, so the next save must write it
+                    self._saved_digest = None
+                else:
+                    self._saved_digest = hashlib.blake2b(self._serialize_config()).digest()
+                self.main_app.log_message(f"Loaded config with {len(self.config['connections'])} connection(s)", "INFO")
         except FileNotFoundError:
             self.config = {
                 'default_connection': 'production',
                 'connections': {}
             }
+            self._saved_digest = None
             self.main_app.log_message("No config.json found, starting with empty configuration", "INFO")
 
+        # Both branches above leave the new format, so bind the connections dict once
+        self.connections = self.config['connections']
+
+    def _serialize_config(self):
+        """Return config as the bytes written to config.json"""
+        # Both produce byte-identical output (orjson only supports a 2-space indent),
+        # so installing or removing orjson never changes the file or forces a rewrite
+        if orjson:
+            return orjson.dumps(self.config, option=orjson.OPT_INDENT_2)
+        return json.dumps(self.config, indent=2, ensure_ascii=False).encode('utf-8')
+
     def save_config(self):
-        """Save config to file"""
+        """Save config to file (skipped if nothing changed since it was loaded or last saved)"""
         try:
-            with open('config.json', 'w') as f:
-                json.dump(self.config, f, indent=4)
+            data = self._serialize_config()
+            digest = hashlib.blake2b(data).digest()
+            if digest == self._saved_digest:
+                self.main_app.log_message("Configuration unchanged, config.json not rewritten", "INFO")
+                return True
+
+            # Write a temporary file next to config.json and swap it in, so a crash
+            # mid-write never leaves a truncated config behind
+            config_dir = os.path.dirname(os.path.abspath('config.json'))
+            fd, tmp_path = tempfile.mkstemp(dir=config_dir, prefix='config.', suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(data)
+                os.replace(tmp_path, 'config.json')
+            except BaseException:
+                os.remove(tmp_path)
+                raise
+            self._saved_digest = digest
+            clear_config_cache()
             self.main_app.log_message("Configuration saved successfully to config.json", "INFO")
             return True
         except Exception as e:
@@ -174,7 +309,7 @@ class ConnectionManagerDialog:
 
     def refresh_list(self):
         """Refresh the connection list"""
-        self.connection_names = list(self.config.get('connections', {}).keys())
+        self.connection_names = list(self.connections.keys())
         self.selected_connection_index = None
         self._update_connection_list_display()
 
@@ -182,7 +317,7 @@ class ConnectionManagerDialog:
         """Handle connection selection"""
         if self.selected_connection_index is not None and self.selected_connection_index < len(self.connection_names):
             conn_name = self.connection_names[self.selected_connection_index]
-            conn_data = self.config['connections'][conn_name]
+            conn_data = self.connections[conn_name]
 
             self.name_var.set(conn_name)
             self.name_entry.configure(state='readonly')
@@ -194,7 +329,9 @@ class ConnectionManagerDialog:
             self.password_var.set(decrypted_password)
             self.driver_var.set(conn_data.get('driver', '{ODBC Driver 17 for SQL Server}'))
 
-            self.main_app.log_message(f"Selected connection: '{conn_name}' (Server: {conn_data.get('server', 'N/A')}, Database: {conn_data.get('database', 'N/A')})", "INFO")
+            # Browsing the list is not worth a line in the on-screen log; keep it in the debug log only
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"Selected connection: '{conn_name}' (Server: {conn_data.get('server', 'N/A')}, Database: {conn_data.get('database', 'N/A')})")
 
     def add_connection(self):
         """Add new connection"""
@@ -205,8 +342,7 @@ class ConnectionManagerDialog:
         self.username_var.set('')
         self.password_var.set('')
         self.driver_var.set('{ODBC Driver 17 for SQL Server}')
-        self.selected_connection_index = None
-        self._update_connection_list_display()
+        self._move_selection_marker(None)
         self.main_app.log_message("New connection form opened", "INFO")
 
     def save_connection(self):
@@ -222,33 +358,46 @@ class ConnectionManagerDialog:
             messagebox.showwarning("Warning", "Please enter a server name")
             return
 
-        is_new = conn_name not in self.config.get('connections', {})
+        is_new = conn_name not in self.connections
 
-        # Encrypt password before saving
-        encrypted_password = encrypt_password(self.password_var.get())
+        # Keep settings that are not edited in this form (e.g. bulk_stage_dir)
+        conn_data = dict(self.connections.get(conn_name, {}))
 
-        conn_data = {
+        # Encrypt password before saving. Encrypting yields a new token every time,
+        # so an unchanged password keeps its stored token and the file stays unchanged.
+        password = self.password_var.get()
+        stored_password = conn_data.get('password', '')
+        if stored_password and stored_password != password and decrypt_password(stored_password) == password:
+            encrypted_password = stored_password
+        else:
+            encrypted_password = encrypt_password(password)
+        conn_data.update({
             'server': self.server_var.get().strip(),
             'database': self.database_var.get().strip(),
             'username': self.username_var.get().strip(),
             'password': encrypted_password,
             'driver': self.driver_var.get().strip()
-        }
+        })
 
         self.main_app.log_message(f"{'Creating' if is_new else 'Updating'} connection '{conn_name}' (Server: {conn_data['server']}, Database: {conn_data['database']}) with encrypted password", "INFO")
 
-        self.config['connections'][conn_name] = conn_data
+        self.connections[conn_name] = conn_data
 
         # Set as default if it's the first connection
-        if len(self.config['connections']) == 1:
+        if len(self.connections) == 1:
             self.config['default_connection'] = conn_name
             self.main_app.log_message(f"Set '{conn_name}' as default connection", "INFO")
 
         if self.save_config():
             self.main_app.log_message(f"Connection '{conn_name}' {'created' if is_new else 'updated'} successfully", "SUCCESS")
+            # Update the main window's connection list once Tk is idle (it re-reads config.json)
+            self.main_app.root.after_idle(self.main_app.refresh_connections)
             messagebox.showinfo("Success", f"Connection '{conn_name}' saved successfully")
-            self.refresh_list()
-            self.main_app.refresh_connections()
+            # Only a new connection changes the list; it is added and selected
+            if is_new:
+                self.connection_names.append(conn_name)
+                self._append_connection_button(conn_name, self.UNSELECTED_COLORS)
+                self._move_selection_marker(len(self.connection_names) - 1)
             self.name_entry.configure(state='readonly')
 
     def delete_connection(self):
@@ -258,17 +407,18 @@ class ConnectionManagerDialog:
             messagebox.showwarning("Warning", "Please select a connection to delete")
             return
 
-        conn_name = self.connection_names[self.selected_connection_index]
+        index = self.selected_connection_index
+        conn_name = self.connection_names[index]
 
         self.main_app.log_message(f"Delete confirmation requested for connection '{conn_name}'", "INFO")
 
         if messagebox.askyesno("Confirm Delete", f"Are you sure you want to delete connection '{conn_name}'?"):
             self.main_app.log_message(f"Deleting connection '{conn_name}'...", "INFO")
-            del self.config['connections'][conn_name]
+            del self.connections[conn_name]
 
             # Update default if needed
             if self.config.get('default_connection') == conn_name:
-                remaining = list(self.config['connections'].keys())
+                remaining = list(self.connections.keys())
                 new_default = remaining[0] if remaining else ''
                 self.config['default_connection'] = new_default
                 if new_default:
@@ -276,9 +426,9 @@ class ConnectionManagerDialog:
 
             if self.save_config():
                 self.main_app.log_message(f"Connection '{conn_name}' deleted successfully", "SUCCESS")
+                self.main_app.root.after_idle(self.main_app.refresh_connections)
                 messagebox.showinfo("Success", f"Connection '{conn_name}' deleted successfully")
-                self.refresh_list()
-                self.main_app.refresh_connections()
+                self._remove_connection_button(index)
                 self.add_connection()  # Clear form
         else:
             self.main_app.log_message(f"Delete cancelled for connection '{conn_name}'", "INFO")
@@ -296,6 +446,11 @@ class ConnectionManagerDialog:
             messagebox.showwarning("Warning", "Please enter a database name")
             return
 
+        # Ignore repeated clicks while a test is still running
+        if self._test_running:
+            self.main_app.log_message("A connection test is already running", "INFO")
+            return
+
         conn_name = self.name_var.get().strip() or "Unnamed"
         self.main_app.log_message(f"Testing connection '{conn_name}' (Server: {self.server_var.get()}, Database: {self.database_var.get()})...", "INFO")
 
@@ -312,46 +467,100 @@ class ConnectionManagerDialog:
         progress.pack(pady=10)
         progress.start()
 
-        def test_in_thread():
-            try:
-                import pyodbc
-                # Password in the form is already decrypted, use it directly
-                conn_str = (
-                    f'DRIVER={self.driver_var.get()};'
-                    f'SERVER={self.server_var.get()};'
-                    f'DATABASE={self.database_var.get()};'
-                    f'UID={self.username_var.get()};'
-                    f'PWD={self.password_var.get()};'
-                )
-                conn = pyodbc.connect(conn_str, timeout=10)
-                conn.close()
-
-                # Close test window and show success
-                test_window.destroy()
+        # Set once the test has been reported, so a late result after the
+        # hard timeout below (or a timeout after a result) is ignored
+        finished = threading.Event()
+
+        def on_hard_timeout():
+            if finished.is_set():
+                return
+            finished.set()
+            # Allow a new test; the hung one's late result is ignored through finished
+            self._test_running = False
+            test_window.destroy()
+            self.main_app.log_message(f"Connection test timed out for '{conn_name}'", "ERROR")
+            messagebox.showerror("Connection Failed", f"Connection test timed out after {self.TEST_LOGIN_TIMEOUT} seconds.\n\nPlease check the server name and network access.")
+
+        # Hard upper bound in case the driver ignores the login timeout
+        test_window.after(self.TEST_LOGIN_TIMEOUT * 1000 + 500, on_hard_timeout)
+
+        # Read the form here on the Tk thread; the worker only gets plain strings.
+        # Password in the form is already decrypted, use it directly
+        server = self.server_var.get()
+        conn_str = build_connection_string(
+            self.driver_var.get(), server, self.database_var.get(), self.username_var.get(), self.password_var.get()
+        )
+
+        def on_test_done(future):
+            # Runs on the Tk thread (run_in_background delivers it through process_queue)
+            if finished.is_set():
+                # Already reported by the hard timeout, which also cleared _test_running
+                # (a newer test may be running by now)
+                return
+            self._test_running = False
+            if not self.dialog.winfo_exists():
+                return
+            finished.set()
+
+            # Close test window and show the result
+            test_window.destroy()
+            e = future.exception()
+            if e is None:
                 self.main_app.log_message(f"Connection test successful for '{conn_name}'", "SUCCESS")
                 messagebox.showinfo("Success", "Connection test successful!")
-            except Exception as e:
-                # Close test window and show error
-                test_window.destroy()
-                error_msg = str(e)
-                # Make error message more readable
-                if "ODBC Driver" in error_msg:
-                    error_msg = "ODBC Driver not found. Please install the specified driver."
-                    self.main_app.log_message(f"Connection test failed for '{conn_name}': ODBC Driver not found", "ERROR")
-                elif "Login failed" in error_msg or "Login timeout" in error_msg:
-                    error_msg = f"Authentication failed. Please check username and password.\n\nDetails: {error_msg}"
-                    self.main_app.log_message(f"Connection test failed for '{conn_name}': Authentication failed", "ERROR")
-                elif "Could not open a connection" in error_msg:
-                    error_msg = f"Could not connect to server. Please check server name.\n\nDetails: {error_msg}"
-                    self.main_app.log_message(f"Connection test failed for '{conn_name}': Could not connect to server", "ERROR")
-                else:
-                    error_msg = f"Connection failed:\n\n{error_msg}"
-                    self.main_app.log_message(f"Connection test failed for '{conn_name}': {str(e)}", "ERROR")
-
-                messagebox.showerror("Connection Failed", error_msg)
-
-        # Start test in background thread
-        threading.Thread(target=test_in_thread, daemon=True).start()
+                return
+
+            error_msg = str(e)
+            # Make error message more readable
+            match = _CONNECTION_ERROR_RE.search(error_msg)
+            kind = match.lastgroup if match else None
+            if kind == "driver":
+                error_msg = "ODBC Driver not found. Please install the specified driver."
+                self.main_app.log_message(f"Connection test failed for '{conn_name}': ODBC Driver not found", "ERROR")
+            elif kind == "auth":
+                error_msg = f"Authentication failed. Please check username and password.\n\nDetails: {error_msg}"
+                self.main_app.log_message(f"Connection test failed for '{conn_name}': Authentication failed", "ERROR")
+            elif kind == "network":
+                error_msg = f"Could not connect to server. Please check server name.\n\nDetails: {error_msg}"
+                self.main_app.log_message(f"Connection test failed for '{conn_name}': Could not connect to server", "ERROR")
+            else:
+                error_msg = f"Connection failed:\n\n{error_msg}"
+                self.main_app.log_message(f"Connection test failed for '{conn_name}': {str(e)}", "ERROR")
+
+            messagebox.showerror("Connection Failed", error_msg)
+
+        # Run the test on the connection-test pool, so it starts right away and the
+        # hard timeout above measures the test itself rather than time spent queued
+        self._test_running = True
+        self.main_app.run_in_background(self._run_connection_test, on_test_done, conn_str, server,
+                                        executor=self.main_app.connection_executor)
+
+    def _run_connection_test(self, conn_str, server):
+        """
+        Connect with the given settings and hand the connection back to the pool
+        (runs in a worker thread, so it must not touch widgets). Raises on failure.
+
+        Args:
+            conn_str: ODBC connection string built from the form
+            server: Server value from the form, used for the TCP port check
+        """
+        started = time.monotonic()
+        # An explicit port means the driver can only use TCP, so an unreachable port
+        # fails the test right away instead of waiting out the login timeout
+        endpoint = _tcp_endpoint(server)
+        if endpoint is not None:
+            try:
+                socket.create_connection(endpoint, timeout=self.TEST_PREFLIGHT_TIMEOUT).close()
+            except OSError as e:
+                raise ConnectionError(f"Could not open a connection to {endpoint[0]} on port {endpoint[1]} ({e})") from e
+
+        # Repeated tests of the same settings reuse the pooled connection after a
+        # SELECT 1 check instead of logging in again; timeout= sets
+        # SQL_ATTR_LOGIN_TIMEOUT before a new connection is made. The login gets what
+        # is left of TEST_LOGIN_TIMEOUT, so the test ends before the dialog's hard timeout.
+        login_timeout = max(1, math.ceil(self.TEST_LOGIN_TIMEOUT - (time.monotonic() - started)))
+        conn = open_connection(conn_str, timeout=login_timeout)
+        release_connection(conn)
 
     def close_dialog(self):
         """Close the dialog"""
@@ -5,13 +5,60 @@ Data Preview Dialog - Preview and edit file data before import
 import tkinter as tk
 from tkinter import ttk, messagebox
 import customtkinter as ctk
-import pandas as pd
+import numpy as np
 import os
-from src.file_processor import get_dataframes, infer_column_type
+from src.file_processor import get_sheet_sources, analyze_chunks, read_sheet_head
+from src.utils import logger
+
+
+# Text shown for NULL cells. A Treeview can't color single cells the way the old
+# per-cell labels grayed out NULLs, so the marker itself stands out from a
+# real "NULL" string value.
+NULL_DISPLAY = "<NULL>"
+
+
+def _format_preview_col(values, na_mask, max_length=25):
+    """
+    Format one column of preview values for display with numpy array operations.
+    Missing values become NULL_DISPLAY and values longer than max_length are truncated with '...'.
+    Returns an object array of display strings.
+    """
+    text = values.astype(str)
+    # Casting to a shorter fixed-width string dtype truncates every value at once
+    truncated = np.char.add(text.astype(f"<U{max_length - 3}"), "...")
+    text = np.where(np.char.str_len(text) > max_length, truncated, text)
+    return np.where(na_mask, NULL_DISPLAY, text).astype(object)
+
+
+def _format_preview(preview_df, max_length=25, na_mask=None):
+    """
+    Format preview values for display, one column at a time.
+    A precomputed na_mask for preview_df can be passed to skip recomputing it.
+    Returns a 2D object array of display strings, one row per preview row.
+    """
+    if na_mask is None:
+        na_mask = preview_df.isna()
+    columns = []
+    for i in range(preview_df.shape[1]):
+        series = preview_df.iloc[:, i]
+        # Typed columns go through pandas' own str formatting (e.g. dates without a midnight time)
+        values = series.to_numpy(object) if series.dtype == object else series.astype(str).to_numpy(object)
+        columns.append(_format_preview_col(values, na_mask.iloc[:, i].to_numpy(bool), max_length))
+    return np.column_stack(columns)
 
 
 class DataPreviewDialog:
     """Dialog for previewing file data and editing column names/types"""
+
+    # Width of one column (editor panel and table column) in pixels at 100% scaling
+    COLUMN_WIDTH = 180
+
+    # Number of rows read and shown in the preview table
+    PREVIEW_ROWS = 20
+
+    # SQL types offered in each column's type menu
+    SQL_TYPES = ("NVARCHAR(MAX)", "BIGINT", "FLOAT", "INT", "DECIMAL(18,2)", "DATE", "DATETIME", "BIT")
+
     def __init__(self, parent, main_app, file_path):
         self.main_app = main_app
         self.file_path = file_path
@@ -30,16 +77,41 @@ class DataPreviewDialog:
         # Get delimiter preference for CSV files
         self.current_delimiter = self.main_app.csv_delimiters.get(file_path, ',')
 
-        # Load file data
+        # Find the sheets without parsing them. The first time a sheet is displayed,
+        # its first rows are read and shown straight away, while the whole sheet is
+        # streamed in chunks in the background for the statistics and types.
         try:
-            self.dataframes = get_dataframes(file_path, delimiter=self.current_delimiter)
-            self.main_app.log_message(f"Loaded {len(self.dataframes)} sheet(s) from {self.filename}", "INFO")
+            self._open_sheet_sources()
+            self.sheet_names = list(self._sheet_sources)
+            self.main_app.log_message(f"Found {len(self.sheet_names)} sheet(s) in {self.filename}", "INFO")
         except Exception as e:
             self.main_app.log_message(f"Failed to load file: {e}", "ERROR")
             messagebox.showerror("Error", f"Failed to load file:\n{e}")
             self.dialog.destroy()
             return
 
+        # Style for the data preview table
+        style = ttk.Style(self.dialog)
+        style.configure("Preview.Treeview", font=("Courier", 9), rowheight=24)
+        style.configure("Preview.Treeview.Heading", font=("Arial", 9, "bold"))
+
+        # Fonts shared by every widget in the dialog, created once instead of per widget
+        self._title_font = ctk.CTkFont(size=12, weight="bold")
+        self._stats_font = ctk.CTkFont(family="Courier", size=11, weight="bold")
+        self._message_font = ctk.CTkFont(size=12)
+        self._entry_font = ctk.CTkFont(size=10)
+        self._small_font = ctk.CTkFont(size=9)
+
+        # Per-sheet caches of the preview rows, detected types and NULL statistics.
+        # They only change on a delimiter reload.
+        self.preview_frames = {}
+        self._infer_cache = {}
+        self._nullstats_cache = {}
+        # Bumped when the dataframes are reloaded, so stale background results are dropped
+        self._data_generation = 0
+        # Sheets whose statistics and types are still being computed in the background
+        self._loading_sheets = set()
+
         # Initialize overrides for this file if not exist
         if file_path not in self.main_app.column_overrides:
             self.main_app.column_overrides[file_path] = {}
@@ -59,7 +131,7 @@ class DataPreviewDialog:
             delimiter_frame.grid(row=current_row, column=0, sticky=(tk.W, tk.E), pady=(0, 10))
             current_row += 1
 
-            ctk.CTkLabel(delimiter_frame, text="CSV Delimiter:", font=ctk.CTkFont(size=12, weight="bold")).pack(side=tk.LEFT, padx=(0, 10))
+            ctk.CTkLabel(delimiter_frame, text="CSV Delimiter:", font=self._title_font).pack(side=tk.LEFT, padx=(0, 10))
 
             self.delimiter_var = tk.StringVar(value=self.current_delimiter)
             delimiter_options = [
@@ -80,32 +152,32 @@ class DataPreviewDialog:
                 ).pack(side=tk.LEFT, padx=5)
 
         # Sheet selector (if multiple sheets)
-        if len(self.dataframes) > 1:
+        if len(self.sheet_names) > 1:
             sheet_frame = ctk.CTkFrame(main_frame, fg_color="transparent")
             sheet_frame.grid(row=current_row, column=0, sticky=(tk.W, tk.E), pady=(0, 10))
             current_row += 1
 
-            ctk.CTkLabel(sheet_frame, text="Sheet:", font=ctk.CTkFont(size=12, weight="bold")).pack(side=tk.LEFT, padx=(0, 10))
+            ctk.CTkLabel(sheet_frame, text="Sheet:", font=self._title_font).pack(side=tk.LEFT, padx=(0, 10))
 
-            self.sheet_var = tk.StringVar(value=list(self.dataframes.keys())[0])
+            self.sheet_var = tk.StringVar(value=self.sheet_names[0])
             sheet_combo = ctk.CTkComboBox(
                 sheet_frame,
                 variable=self.sheet_var,
-                values=list(self.dataframes.keys()),
+                values=self.sheet_names,
                 state="readonly",
                 width=250,
                 command=lambda choice: self.load_sheet()
             )
             sheet_combo.pack(side=tk.LEFT)
         else:
-            self.sheet_var = tk.StringVar(value=list(self.dataframes.keys())[0])
+            self.sheet_var = tk.StringVar(value=self.sheet_names[0])
 
         # Content frame (will hold stats and data grid)
-        self.content_frame = ctk.CTkFrame(main_frame, fg_color="transparent")
-        self.content_frame.grid(row=current_row, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+        self._content_parent = main_frame
+        self._content_row = current_row
+        self.content_frame = None
+        self._create_content_frame()
         current_row += 1
-        self.content_frame.columnconfigure(0, weight=1)
-        self.content_frame.rowconfigure(1, weight=1)
 
         # Bottom buttons
         button_frame = ctk.CTkFrame(main_frame, fg_color="transparent")
@@ -118,18 +190,63 @@ class DataPreviewDialog:
         # Load first sheet
         self.load_sheet()
 
+    def _open_sheet_sources(self):
+        """Set up the per-sheet chunk streams for the current delimiter"""
+        self._sheet_sources = get_sheet_sources(self.file_path, delimiter=self.current_delimiter)
+
+    def _create_content_frame(self):
+        """(Re)create the frame holding the stats and data grid, destroying the previous one"""
+        # Destroying the parent frame tears down all of its children in one call
+        if self.content_frame is not None:
+            self.content_frame.destroy()
+        self.content_frame = ctk.CTkFrame(self._content_parent, fg_color="transparent")
+        self.content_frame.grid(row=self._content_row, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+        self.content_frame.columnconfigure(0, weight=1)
+        self.content_frame.rowconfigure(1, weight=1)
+
     def load_sheet(self):
         """Load and display the selected sheet"""
         # Clear content frame
-        for widget in self.content_frame.winfo_children():
-            widget.destroy()
+        if self.content_frame.winfo_children():
+            self._create_content_frame()
 
         sheet_name = self.sheet_var.get()
-        df = self.dataframes[sheet_name]
 
-        # Reset column edit widgets for new sheet
-        self.column_name_vars = {}
-        self.column_type_vars = {}
+        # Reading the preview rows and analyzing the whole sheet (NULL statistics and
+        # type detection) run as two jobs on the main app's worker pool. The preview
+        # rows are shown as soon as they are read; the statistics and column editors
+        # are added once the analysis is cached. Switching back to a sheet that is
+        # still loading just waits for it.
+        if not self._sheet_loaded(sheet_name) and sheet_name not in self._loading_sheets:
+            self._loading_sheets.add(sheet_name)
+            generation = self._data_generation
+            get_chunks = self._sheet_sources[sheet_name]
+            self.main_app.run_in_background(
+                read_sheet_head,
+                lambda future: self._on_preview_read(future, sheet_name, generation),
+                get_chunks,
+                self.PREVIEW_ROWS
+            )
+            self.main_app.run_in_background(
+                self._load_sheet_data,
+                lambda future: self._on_sheet_analyzed(future, sheet_name, generation),
+                get_chunks,
+                self.PREVIEW_ROWS
+            )
+
+        if sheet_name not in self.preview_frames:
+            ctk.CTkLabel(self.content_frame, text=f"Loading sheet '{sheet_name}'...", font=self._message_font).grid(row=0, column=0, pady=20)
+            return
+
+        df = self.preview_frames[sheet_name]
+        analyzed = self._sheet_loaded(sheet_name)
+
+        # Reset column values and edit widgets for new sheet. Values live in plain
+        # dicts; the widgets are only read back when changes are applied.
+        self.column_name_values = {}
+        self.column_type_values = {}
+        self.column_name_entries = {}
+        self.column_type_menus = {}
 
         # Statistics frame
         stats_frame = ctk.CTkFrame(self.content_frame)
@@ -137,17 +254,20 @@ class DataPreviewDialog:
         stats_frame.columnconfigure(1, weight=1)
 
         # Frame label
-        ctk.CTkLabel(stats_frame, text="Statistics", font=ctk.CTkFont(size=12, weight="bold")).grid(row=0, column=0, columnspan=3, sticky=tk.W, padx=10, pady=(10, 5))
+        ctk.CTkLabel(stats_frame, text="Statistics", font=self._title_font).grid(row=0, column=0, columnspan=3, sticky=tk.W, padx=10, pady=(10, 5))
 
-        # Display statistics
-        row_count = len(df)
+        # Display statistics (counted over the whole sheet, so they may still be pending)
         col_count = len(df.columns)
-        null_counts = df.isna().sum()
-        total_nulls = null_counts.sum()
-
-        ctk.CTkLabel(stats_frame, text=f"Rows: {row_count:,}", font=ctk.CTkFont(family="Courier", size=11, weight="bold")).grid(row=1, column=0, sticky=tk.W, padx=10, pady=(0, 10))
-        ctk.CTkLabel(stats_frame, text=f"Columns: {col_count}", font=ctk.CTkFont(family="Courier", size=11, weight="bold")).grid(row=1, column=1, sticky=tk.W, padx=20, pady=(0, 10))
-        ctk.CTkLabel(stats_frame, text=f"NULL values: {total_nulls:,}", font=ctk.CTkFont(family="Courier", size=11, weight="bold"), text_color="orange" if total_nulls > 0 else "green").grid(row=1, column=2, sticky=tk.W, pady=(0, 10))
+        if analyzed:
+            row_count, null_counts, total_nulls, preview_na_mask = self._nullstats_cache[sheet_name]
+            ctk.CTkLabel(stats_frame, text=f"Rows: {row_count:,}", font=self._stats_font).grid(row=1, column=0, sticky=tk.W, padx=10, pady=(0, 10))
+            ctk.CTkLabel(stats_frame, text=f"Columns: {col_count}", font=self._stats_font).grid(row=1, column=1, sticky=tk.W, padx=20, pady=(0, 10))
+            ctk.CTkLabel(stats_frame, text=f"NULL values: {total_nulls:,}", font=self._stats_font, text_color="orange" if total_nulls > 0 else "green").grid(row=1, column=2, sticky=tk.W, pady=(0, 10))
+        else:
+            preview_na_mask = None
+            ctk.CTkLabel(stats_frame, text="Rows: counting...", font=self._stats_font).grid(row=1, column=0, sticky=tk.W, padx=10, pady=(0, 10))
+            ctk.CTkLabel(stats_frame, text=f"Columns: {col_count}", font=self._stats_font).grid(row=1, column=1, sticky=tk.W, padx=20, pady=(0, 10))
+            ctk.CTkLabel(stats_frame, text="NULL values: counting...", font=self._stats_font).grid(row=1, column=2, sticky=tk.W, pady=(0, 10))
 
         # Preview frame with scrollable area
         preview_container = ctk.CTkFrame(self.content_frame)
@@ -156,113 +276,236 @@ class DataPreviewDialog:
         preview_container.rowconfigure(1, weight=1)
 
         # Frame label
-        ctk.CTkLabel(preview_container, text=f"Data Preview (First 20 rows) - Sheet: {sheet_name}", font=ctk.CTkFont(size=12, weight="bold")).grid(row=0, column=0, sticky=tk.W, padx=10, pady=(10, 5))
+        ctk.CTkLabel(preview_container, text=f"Data Preview (First {self.PREVIEW_ROWS} rows) - Sheet: {sheet_name}", font=self._title_font).grid(row=0, column=0, sticky=tk.W, padx=10, pady=(10, 5))
 
-        # Create scrollable frame for data
-        scrollable_frame = ctk.CTkScrollableFrame(
-            preview_container,
-            orientation="horizontal",
-            label_text="",
-            height=500  # Fixed height to ensure visibility
-        )
-        scrollable_frame.grid(row=1, column=0, sticky=(tk.W, tk.E, tk.N, tk.S), padx=10, pady=(0, 10))
-
-        # Inner container for all columns
-        inner_container = ctk.CTkFrame(scrollable_frame, fg_color="transparent")
-        inner_container.pack(fill=tk.BOTH, expand=True)
+        # Grid frame: column editors on top, data table below, one shared horizontal scrollbar
+        grid_frame = ctk.CTkFrame(preview_container, fg_color="transparent")
+        grid_frame.grid(row=1, column=0, sticky=(tk.W, tk.E, tk.N, tk.S), padx=10, pady=(0, 10))
+        grid_frame.columnconfigure(0, weight=1)
+        grid_frame.rowconfigure(1, weight=1)
 
         # Get existing overrides for this sheet
         sheet_overrides = self.main_app.column_overrides.get(self.file_path, {}).get(sheet_name, {})
         column_name_overrides = sheet_overrides.get('columns', {})
         column_type_overrides = sheet_overrides.get('types', {})
 
-        # Available SQL types
-        sql_types = ["NVARCHAR(MAX)", "BIGINT", "FLOAT", "INT", "DECIMAL(18,2)", "DATE", "DATETIME", "BIT"]
+        # Detected SQL types (inferred once per sheet)
+        detected_types = self._infer_cache.get(sheet_name)
 
-        # Create unified grid with column headers and data
-        # Display first 20 rows
-        preview_df = df.head(20)
+        # Display the preview rows
+        preview_df = df
 
         # Handle empty dataframe
         if len(preview_df) == 0:
             ctk.CTkLabel(
-                inner_container,
+                grid_frame,
                 text="No data rows in this sheet",
-                font=ctk.CTkFont(size=12),
+                font=self._message_font,
                 text_color="orange"
-            ).pack(pady=20)
+            ).grid(row=0, column=0, pady=20)
             return
 
-        # Create grid layout for columns
-        for col_idx, col_name in enumerate(df.columns):
-            # Create a container frame for each column (header + data)
-            column_container = ctk.CTkFrame(inner_container, corner_radius=5, width=180)
-            column_container.grid(row=0, column=col_idx, sticky=(tk.N, tk.S), padx=3, pady=3)
-            # Allow container to expand vertically for data cells
-            column_container.grid_rowconfigure(list(range(len(preview_df) + 1)), weight=0)
-            column_container.grid_columnconfigure(0, weight=1)
+        # Column editors live in a canvas so they scroll together with the table
+        header_canvas = tk.Canvas(grid_frame, highlightthickness=0, bd=0, bg=self._canvas_bg(preview_container))
+        header_canvas.grid(row=0, column=0, sticky=(tk.W, tk.E))
+        header_inner = ctk.CTkFrame(header_canvas, fg_color="transparent")
+        header_canvas.create_window((0, 0), window=header_inner, anchor=tk.NW)
+
+        # Building editors fires one <Configure> per widget; coalesce them so the
+        # bbox("all") walk runs once per idle period instead of once per event
+        self._cfg_pending = False
+
+        def update_scrollregion():
+            self._cfg_pending = False
+            if header_canvas.winfo_exists():
+                header_canvas.configure(scrollregion=header_canvas.bbox("all"), height=header_inner.winfo_reqheight())
+
+        def configure_canvas(event):
+            if self._cfg_pending:
+                return
+            self._cfg_pending = True
+            header_canvas.after_idle(update_scrollregion)
+        header_inner.bind("<Configure>", configure_canvas)
+
+        # Data table: one native widget instead of a label per cell
+        columns = list(df.columns)
+        tree = ttk.Treeview(grid_frame, columns=columns, show="headings", height=len(preview_df), style="Preview.Treeview")
+        tree.grid(row=1, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+
+        def xview_both(*args):
+            tree.xview(*args)
+            header_canvas.xview(*args)
+
+        def on_tree_xscroll(first, last):
+            xscrollbar.set(first, last)
+            header_canvas.xview_moveto(first)
+            if analyzed:
+                build_visible_editors()
+
+        xscrollbar = ctk.CTkScrollbar(grid_frame, orientation="horizontal", command=xview_both)
+        xscrollbar.grid(row=2, column=0, sticky=(tk.W, tk.E))
+        tree.configure(xscrollcommand=on_tree_xscroll)
+
+        # CTk scales the editor widgets with the DPI/widget scaling, but the grid minsize,
+        # Treeview columns and canvas coordinates are raw pixels, so scale the width here
+        column_width = round(self.COLUMN_WIDTH * ctk.ScalingTracker.get_widget_scaling(self.dialog))
+
+        for col_idx, col_name in enumerate(columns):
+            # Keep editor and table columns the same width so they line up.
+            # The minsize also reserves space for editors that are not built yet.
+            header_inner.grid_columnconfigure(col_idx, minsize=column_width)
+            tree.heading(col_name, text=col_name, anchor=tk.W)
+            tree.column(col_name, width=column_width, minwidth=column_width, stretch=False, anchor=tk.W)
+
+            # Values exist for every column, so apply/reset also cover columns
+            # whose editor has not been scrolled into view
+            if analyzed:
+                self.column_name_values[col_name] = column_name_overrides.get(col_name, col_name)
+                self.column_type_values[col_name] = column_type_overrides.get(col_name, detected_types[col_name])
+
+        def build_column_editor(col_idx):
+            col_name = columns[col_idx]
 
             # Header section with edit controls
-            col_frame = ctk.CTkFrame(column_container, fg_color=("#E8E8E8", "#2B2B2B"))
-            col_frame.grid(row=0, column=0, sticky=(tk.W, tk.E), padx=2, pady=2)
+            col_frame = ctk.CTkFrame(header_inner, fg_color=("#E8E8E8", "#2B2B2B"), corner_radius=5)
+            col_frame.grid(row=0, column=col_idx, sticky=(tk.W, tk.E, tk.N, tk.S), padx=3, pady=3)
 
             # Column name editor
-            ctk.CTkLabel(col_frame, text="Column Name:", font=ctk.CTkFont(size=9)).pack(anchor=tk.W, padx=5, pady=(5, 0))
-            name_var = tk.StringVar(value=column_name_overrides.get(col_name, col_name))
-            name_entry = ctk.CTkEntry(col_frame, textvariable=name_var, width=160, height=28, font=ctk.CTkFont(size=10))
+            ctk.CTkLabel(col_frame, text="Column Name:", font=self._small_font).pack(anchor=tk.W, padx=5, pady=(5, 0))
+            name_entry = ctk.CTkEntry(col_frame, width=160, height=28, font=self._entry_font)
+            name_entry.insert(0, self.column_name_values[col_name])
             name_entry.pack(fill=tk.X, padx=5, pady=(2, 5))
-            self.column_name_vars[col_name] = name_var
+            self.column_name_entries[col_name] = name_entry
 
             # Detected type display
-            detected_type = infer_column_type(df[col_name], col_name)
-            ctk.CTkLabel(col_frame, text=f"Detected: {detected_type}", font=ctk.CTkFont(size=9), text_color="gray").pack(anchor=tk.W, padx=5)
+            ctk.CTkLabel(col_frame, text=f"Detected: {detected_types[col_name]}", font=self._small_font, text_color="gray").pack(anchor=tk.W, padx=5)
 
             # Type selector
-            ctk.CTkLabel(col_frame, text="SQL Type:", font=ctk.CTkFont(size=9)).pack(anchor=tk.W, padx=5, pady=(3, 0))
-            type_var = tk.StringVar(value=column_type_overrides.get(col_name, detected_type))
+            ctk.CTkLabel(col_frame, text="SQL Type:", font=self._small_font).pack(anchor=tk.W, padx=5, pady=(3, 0))
             type_menu = ctk.CTkOptionMenu(
                 col_frame,
-                variable=type_var,
-                values=sql_types,
+                values=list(self.SQL_TYPES),
                 width=160,
                 height=28,
-                font=ctk.CTkFont(size=9),
-                dropdown_font=ctk.CTkFont(size=9)
+                font=self._small_font,
+                dropdown_font=self._small_font
             )
+            type_menu.set(self.column_type_values[col_name])
             type_menu.pack(fill=tk.X, padx=5, pady=(2, 5))
-            self.column_type_vars[col_name] = type_var
+            self.column_type_menus[col_name] = type_menu
 
             # NULL count for this column
             null_count = null_counts[col_name]
             null_pct = (null_count / row_count * 100) if row_count > 0 else 0
             null_color = "#c62828" if null_count > 0 else "#2e7d32"
-            ctk.CTkLabel(col_frame, text=f"NULLs: {null_count} ({null_pct:.1f}%)", font=ctk.CTkFont(size=9), text_color=null_color).pack(anchor=tk.W, padx=5, pady=(0, 5))
-
-            # Data cells for this column
-            for row_idx, value in enumerate(preview_df[col_name]):
-                # Format value
-                if pd.isna(value):
-                    display_value = "NULL"
-                    text_color = "gray"
-                else:
-                    display_value = str(value)
-                    if len(display_value) > 25:
-                        display_value = display_value[:22] + "..."
-                    text_color = None  # Use default color
-
-                # Create label directly (simpler approach)
-                cell_label = ctk.CTkLabel(
-                    column_container,
-                    text=display_value,
-                    font=ctk.CTkFont(family="Courier", size=9),
-                    anchor="w",
-                    text_color=text_color,
-                    fg_color=("#F5F5F5", "#3B3B3B"),
-                    corner_radius=3,
-                    height=24,
-                    padx=5
-                )
-                cell_label.grid(row=row_idx+1, column=0, sticky=(tk.W, tk.E), padx=2, pady=1)
+            ctk.CTkLabel(col_frame, text=f"NULLs: {null_count} ({null_pct:.1f}%)", font=self._small_font, text_color=null_color).pack(anchor=tk.W, padx=5, pady=(0, 5))
+
+        # Editors are only built for columns inside the visible x-range, and
+        # materialized on demand as the user scrolls or resizes the dialog
+        self._built_cols = set()
+
+        def build_visible_editors(event=None):
+            left = header_canvas.canvasx(0)
+            right = header_canvas.canvasx(max(header_canvas.winfo_width(), column_width))
+            first = max(0, int(left // column_width))
+            last = min(len(columns) - 1, int(right // column_width))
+            for col_idx in range(first, last + 1):
+                if col_idx not in self._built_cols:
+                    self._built_cols.add(col_idx)
+                    build_column_editor(col_idx)
+
+        if analyzed:
+            header_canvas.bind("<Configure>", build_visible_editors)
+            build_visible_editors()
+        else:
+            # The editors need the detected types; the sheet is redrawn with them once
+            # the analysis finishes
+            ctk.CTkLabel(header_inner, text="Counting rows and detecting column types...", font=self._message_font).grid(row=0, column=0, columnspan=len(columns), sticky=tk.W, padx=5, pady=10)
+
+        # Data rows
+        for row in _format_preview(preview_df, na_mask=preview_na_mask):
+            tree.insert("", tk.END, values=tuple(row))
+
+    @staticmethod
+    def _load_sheet_data(get_chunks, preview_rows):
+        """
+        Read a sheet's preview rows and analyze the whole sheet (runs in a worker thread).
+        The sheet is streamed chunk by chunk with the same reader the conversion uses,
+        so it is never held in memory as a whole and the preview columns, statistics
+        and detected types all match what will be loaded.
+
+        Returns:
+            Tuple of (preview_df, (row_count, null_counts, total_nulls, preview_na_mask), detected_types)
+        """
+        preview_df, row_count, null_counts, detected_types = analyze_chunks(get_chunks(), preview_rows)
+        nullstats = (row_count, null_counts.to_dict(), int(null_counts.sum()), preview_df.isna())
+        return preview_df, nullstats, detected_types
+
+    def _on_preview_read(self, future, sheet_name, generation):
+        """Show a sheet's preview rows while its analysis is still running"""
+        if not self.dialog.winfo_exists() or generation != self._data_generation:
+            return
+        # Once the analysis has finished (or failed), its result is what is shown
+        if sheet_name not in self._loading_sheets:
+            return
+        try:
+            self.preview_frames[sheet_name] = future.result()
+        except Exception as e:
+            # The analysis reads the same sheet and reports the error
+            logger.debug(f"Could not read preview rows of sheet '{sheet_name}': {e}")
+            return
+        if self.sheet_var.get() == sheet_name:
+            self.load_sheet()
+
+    def _on_sheet_analyzed(self, future, sheet_name, generation):
+        """Cache a finished sheet analysis and display the sheet if it is still selected"""
+        if not self.dialog.winfo_exists() or generation != self._data_generation:
+            return
+        self._loading_sheets.discard(sheet_name)
+        try:
+            preview_df, self._nullstats_cache[sheet_name], self._infer_cache[sheet_name] = future.result()
+        except Exception as e:
+            self.main_app.log_message(f"Failed to load sheet '{sheet_name}': {e}", "ERROR")
+            # Drop the preview rows shown meanwhile; selecting the sheet again retries
+            self.preview_frames.pop(sheet_name, None)
+            if self.sheet_var.get() == sheet_name:
+                self._create_content_frame()
+                ctk.CTkLabel(self.content_frame, text=f"Failed to load sheet '{sheet_name}'", font=self._message_font, text_color="orange").grid(row=0, column=0, pady=20)
+            messagebox.showerror("Error", f"Failed to load sheet '{sheet_name}':\n{e}")
+            return
+        # The analysis saw the whole sheet, so its preview rows have every column
+        self.preview_frames[sheet_name] = preview_df
+        row_count = self._nullstats_cache[sheet_name][0]
+        self.main_app.log_message(f"Loaded sheet '{sheet_name}': {row_count:,} rows, {len(preview_df.columns)} columns", "INFO")
+        if self.sheet_var.get() == sheet_name:
+            self.load_sheet()
+
+    def _sheet_loaded(self, sheet_name):
+        """Return True if the sheet has been read and analyzed"""
+        return (sheet_name in self.preview_frames and sheet_name in self._infer_cache
+                and sheet_name in self._nullstats_cache)
+
+    def _sheet_ready(self, sheet_name):
+        """Return True once the sheet is loaded and analyzed, telling the user to wait otherwise"""
+        if self._sheet_loaded(sheet_name):
+            return True
+        messagebox.showinfo("Please Wait", f"Sheet '{sheet_name}' is still being loaded.")
+        return False
+
+    @staticmethod
+    def _canvas_bg(widget):
+        """Resolve a CTk widget's fg_color for the current appearance mode (for plain tk widgets)"""
+        color = widget.cget("fg_color")
+        if isinstance(color, (list, tuple)):
+            color = color[1] if ctk.get_appearance_mode() == "Dark" else color[0]
+        return color
+
+    def _column_values(self, col_name):
+        """Return the current (name, type) for a column, read from its editor if it has been built"""
+        if col_name in self.column_name_entries:
+            self.column_name_values[col_name] = self.column_name_entries[col_name].get()
+            self.column_type_values[col_name] = self.column_type_menus[col_name].get()
+        return self.column_name_values[col_name], self.column_type_values[col_name]
 
     def reload_with_delimiter(self):
         """Reload CSV file with new delimiter"""
@@ -277,9 +520,13 @@ class DataPreviewDialog:
         self.main_app.log_message(f"Reloading {self.filename} with delimiter: '{new_delimiter}'", "INFO")
 
         try:
-            # Reload dataframes with new delimiter
-            self.dataframes = get_dataframes(self.file_path, delimiter=new_delimiter)
-            self.main_app.log_message(f"Reloaded with new delimiter successfully", "SUCCESS")
+            # Forget the parsed data; the current sheet is re-read in the background
+            self._open_sheet_sources()
+            self.preview_frames.clear()
+            self._infer_cache.clear()
+            self._nullstats_cache.clear()
+            self._loading_sheets.clear()
+            self._data_generation += 1
 
             # Reload the current sheet display
             self.load_sheet()
@@ -292,15 +539,17 @@ class DataPreviewDialog:
     def apply_changes(self):
         """Apply column name and type overrides"""
         sheet_name = self.sheet_var.get()
+        if not self._sheet_ready(sheet_name):
+            return
 
         # Collect overrides
         column_name_map = {}
         column_type_map = {}
 
-        df = self.dataframes[sheet_name]
+        df = self.preview_frames[sheet_name]
         for original_col in df.columns:
-            new_name = self.column_name_vars[original_col].get().strip()
-            new_type = self.column_type_vars[original_col].get()
+            new_name, new_type = self._column_values(original_col)
+            new_name = new_name.strip()
 
             if new_name and new_name != original_col:
                 column_name_map[original_col] = new_name
@@ -325,7 +574,7 @@ class DataPreviewDialog:
         self.main_app.log_message(f"Applied overrides for sheet '{sheet_name}': {len(column_name_map)} column renames, {len(column_type_map)} type overrides", "SUCCESS")
 
         # If multiple sheets, stay open; otherwise close
-        if len(self.dataframes) > 1:
+        if len(self.sheet_names) > 1:
             messagebox.showinfo("Success", f"Changes applied for sheet '{sheet_name}'.\n\nYou can now select another sheet or close this dialog.")
         else:
             messagebox.showinfo("Success", "Changes applied successfully!")
@@ -334,14 +583,20 @@ class DataPreviewDialog:
     def reset_defaults(self):
         """Reset all overrides for current sheet to defaults"""
         sheet_name = self.sheet_var.get()
-        df = self.dataframes[sheet_name]
+        if not self._sheet_ready(sheet_name):
+            return
+        df = self.preview_frames[sheet_name]
 
         if messagebox.askyesno("Reset to Defaults", f"Reset all column names and types to detected defaults for sheet '{sheet_name}'?"):
             # Clear all overrides for this sheet
             for col_name in df.columns:
-                self.column_name_vars[col_name].set(col_name)
-                detected_type = infer_column_type(df[col_name], col_name)
-                self.column_type_vars[col_name].set(detected_type)
+                self.column_name_values[col_name] = col_name
+                detected_type = self._infer_cache[sheet_name][col_name]
+                self.column_type_values[col_name] = detected_type
+                if col_name in self.column_name_entries:
+                    self.column_name_entries[col_name].delete(0, tk.END)
+                    self.column_name_entries[col_name].insert(0, col_name)
+                    self.column_type_menus[col_name].set(detected_type)
 
             # Remove from stored overrides
             if self.file_path in self.main_app.column_overrides and sheet_name in self.main_app.column_overrides[self.file_path]:
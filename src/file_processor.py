@@ -3,110 +3,505 @@ File reading and processing functions
 """
 
 import pandas as pd
+import contextlib
+import datetime
 import os
+import logging
+import pickle
+import queue
+import threading
+import openpyxl
 from .utils import sanitize_name, logger
+try:
+    import python_calamine
+except ImportError:  # optional, much faster .xlsx parsing
+    python_calamine = None
+try:
+    import pyarrow
+except ImportError:  # optional, compact string columns
+    pyarrow = None
 
-def get_dataframes(file_path, delimiter=','):
-    """
-    Read file and return a dictionary of dataframes.
-    For CSV: returns {'sheet1': dataframe}
-    For Excel: returns {sheet_name: dataframe} for each sheet
+# dtype for the text columns of loaded files: Arrow-backed strings (contiguous
+# buffers instead of one Python object per cell) when pyarrow is installed
+TEXT_DTYPE = 'string[pyarrow]' if pyarrow is not None else str
 
-    Args:
-        file_path: Path to the file to read
-        delimiter: Delimiter for CSV files (default: ',')
-    """
-    logger.info(f"Reading file: {file_path}")
-    _, file_extension = os.path.splitext(file_path)
-    dataframes = {}
-
-    if file_extension.lower() == '.csv':
-        logger.debug(f"File type: CSV (delimiter: '{delimiter}')")
-        # Read CSV with all columns as strings to preserve formatting
-        df = pd.read_csv(file_path, dtype=str, keep_default_na=False, delimiter=delimiter)
-        logger.info(f"CSV loaded: {len(df)} rows, {len(df.columns)} columns")
-        # Replace empty strings with NaN for proper NULL handling
-        df = df.replace('', pd.NA)
-        # Sanitize column names
-        df.columns = [sanitize_name(col) for col in df.columns]
-        dataframes['sheet1'] = df
-
-    elif file_extension.lower() in ['.xls', '.xlsx']:
-        logger.debug("File type: Excel")
-        # Read all sheets from Excel file
-        excel_file = pd.ExcelFile(file_path)
-        logger.info(f"Found {len(excel_file.sheet_names)} sheet(s): {excel_file.sheet_names}")
-        for sheet_name in excel_file.sheet_names:
-            logger.debug(f"Reading sheet: {sheet_name}")
-            # Read each sheet with all columns as strings to preserve leading zeros and formatting
-            df = pd.read_excel(file_path, sheet_name=sheet_name, dtype=str, keep_default_na=False)
-            logger.info(f"Sheet '{sheet_name}' loaded: {len(df)} rows, {len(df.columns)} columns")
-            # Replace empty strings with NaN for proper NULL handling
-            df = df.replace('', pd.NA)
-            # Sanitize column names
-            df.columns = [sanitize_name(col) for col in df.columns]
-            # Use sanitized sheet name as key
-            dataframes[sanitize_name(sheet_name)] = df
-    else:
-        logger.error(f"Unsupported file type: {file_extension}")
-        raise ValueError(f"Unsupported file type: {file_extension}")
-
-    return dataframes
+# Reader for .xlsx sheets: the Rust-based calamine parser when it is installed,
+# otherwise openpyxl (pure Python, several times slower on large sheets)
+XLSX_ENGINE = 'calamine' if python_calamine is not None else 'openpyxl'
+
+# SQL types for columns that already carry a typed (non-string) dtype, keyed by dtype.kind.
+# String/object columns ('O') are analyzed with vectorized string checks in infer_column_type.
+KIND_TO_SQL = {
+    'i': 'BIGINT',
+    'u': 'BIGINT',
+    'f': 'FLOAT',
+    'M': 'DATETIME',
+    'b': 'BIT',
+}
+
+# Default number of rows per chunk when a sheet is streamed
+CHUNK_SIZE = 10000
+
+# Columns with more non-null values than this are first checked on a random sample
+# of this size, so text columns are recognized without scanning every value
+INFER_SAMPLE_SIZE = 10000
+
+def _read_excel_sheet(file_path, sheet_name):
+    """Read one whole Excel sheet as strings with NULLs and sanitized column names"""
+    # Read with all columns as strings to preserve leading zeros and formatting;
+    # only empty cells become NULL (parsed as NaN directly, no extra replace pass)
+    df = pd.read_excel(file_path, sheet_name=sheet_name, dtype=TEXT_DTYPE, keep_default_na=False, na_values=[''])
+    # Sanitize column names
+    df.columns = [sanitize_name(col) for col in df.columns]
+    return df
 
 def infer_column_type(series, column_name):
     """
     Infer the best SQL column type for a series by analyzing its values.
     Returns the SQL type as a string.
     """
+    # Runs for every column of every chunk, so debug messages are only built when they will be logged
+    debug = logger.isEnabledFor(logging.DEBUG)
+
     # Remove NA values for analysis
     non_null = series.dropna()
 
     if len(non_null) == 0:
-        logger.debug(f"Column '{column_name}': All NULL values, using NVARCHAR(MAX)")
+        if debug:
+            logger.debug(f"Column '{column_name}': All NULL values, using NVARCHAR(MAX)")
         return "NVARCHAR(MAX)"
 
-    # Check if all values are numeric (and don't have leading zeros)
-    all_numeric = True
-    has_decimals = False
-    has_leading_zeros = False
+    # Typed columns map straight to a SQL type without scanning values
+    sql_type = KIND_TO_SQL.get(series.dtype.kind)
+    if sql_type is not None:
+        if debug:
+            logger.debug(f"Column '{column_name}': dtype {series.dtype} detected, using {sql_type}")
+        return sql_type
+
+    # A leading zero or non-numeric value in a sample is conclusive for the whole
+    # column; otherwise the full checks below still run, so the result is exact
+    if len(non_null) > INFER_SAMPLE_SIZE:
+        sample = non_null.sample(INFER_SAMPLE_SIZE, random_state=0).astype(str).str.strip()
+        if sample.str.match(r'0\d').any() or pd.to_numeric(sample, errors='coerce').isna().any():
+            if debug:
+                logger.debug(f"Column '{column_name}': Text values found in sample, using NVARCHAR(MAX)")
+            return "NVARCHAR(MAX)"
 
-    for val in non_null:
-        val_str = str(val).strip()
+    # Analyze all values at once (stripped string form, as entered in the file)
+    values = non_null.astype(str).str.strip()
 
-        # Check for leading zeros (except single "0")
-        if val_str.startswith('0') and len(val_str) > 1 and val_str[1].isdigit():
-            has_leading_zeros = True
-            all_numeric = False
-            logger.debug(f"Column '{column_name}': Leading zeros detected (e.g., '{val_str}'), using NVARCHAR(MAX)")
-            break
+    # Leading zeros (except a single "0") mean codes/identifiers, not numbers
+    if values.str.match(r'0\d').any():
+        if debug:
+            logger.debug(f"Column '{column_name}': Leading zeros detected, using NVARCHAR(MAX)")
+        return "NVARCHAR(MAX)"
 
-        # Try to convert to number
-        try:
-            float(val_str)
-            if '.' in val_str or 'e' in val_str.lower() or 'E' in val_str:
-                has_decimals = True
-        except (ValueError, TypeError):
-            all_numeric = False
-            break
+    # Check if all values are numeric
+    numbers = pd.to_numeric(values, errors='coerce')
+    if numbers.isna().any():
+        if debug:
+            logger.debug(f"Column '{column_name}': Non-numeric data detected, using NVARCHAR(MAX)")
+        return "NVARCHAR(MAX)"
 
     # Determine the appropriate type
-    if has_leading_zeros or not all_numeric:
-        logger.debug(f"Column '{column_name}': Non-numeric data detected, using NVARCHAR(MAX)")
-        return "NVARCHAR(MAX)"
-    elif has_decimals:
-        logger.debug(f"Column '{column_name}': Decimal values detected, using FLOAT")
+    if values.str.contains(r'[.eE]').any():
+        if debug:
+            logger.debug(f"Column '{column_name}': Decimal values detected, using FLOAT")
         return "FLOAT"
-    else:
-        # Check if values fit in BIGINT range
+
+    # Check if values fit in BIGINT range. The extremes are compared as Python
+    # numbers, which is exact for both int and float (inf fails both comparisons).
+    as_python = int if numbers.dtype.kind in 'iu' else float
+    min_val, max_val = as_python(numbers.min()), as_python(numbers.max())
+    if -9223372036854775808 <= min_val and max_val <= 9223372036854775807:
+        if debug:
+            logger.debug(f"Column '{column_name}': Integer values detected, using BIGINT")
+        return "BIGINT"
+    if debug:
+        logger.debug(f"Column '{column_name}': Values exceed BIGINT range, using NVARCHAR(MAX)")
+    return "NVARCHAR(MAX)"
+
+def infer_dataframe_types(df, columns=None, skip_empty=False):
+    """
+    Infer SQL column types for several columns of a DataFrame.
+    Dtypes and NULL-ness are summarized once for the whole frame, so typed and
+    all-NULL columns are resolved from that summary and only text columns are
+    scanned by infer_column_type.
+
+    Args:
+        df: DataFrame to analyze
+        columns: Columns to infer (default: all columns)
+        skip_empty: If True, leave all-NULL columns out of the result instead of
+            mapping them to NVARCHAR(MAX)
+    """
+    if columns is None:
+        columns = list(df.columns)
+    frame = df[columns]
+    kinds = {col: dtype.kind for col, dtype in frame.dtypes.items()}
+    has_values = frame.notna().any().to_dict()
+
+    types = {}
+    for col in columns:
+        if not has_values[col]:
+            if not skip_empty:
+                types[col] = "NVARCHAR(MAX)"
+        elif kinds[col] in KIND_TO_SQL:
+            types[col] = KIND_TO_SQL[kinds[col]]
+        else:
+            types[col] = infer_column_type(frame[col], col)
+    return types
+
+# Order in which inferred types widen when results from several chunks are merged
+_TYPE_WIDENING = {"BIGINT": 0, "FLOAT": 1, "NVARCHAR(MAX)": 2}
+
+def _widen_type(current_type, new_type):
+    """Return the narrowest SQL type that can hold values of both types"""
+    if current_type is None or current_type == new_type:
+        return new_type
+    if current_type in _TYPE_WIDENING and new_type in _TYPE_WIDENING:
+        return max(current_type, new_type, key=_TYPE_WIDENING.get)
+    return "NVARCHAR(MAX)"
+
+def analyze_chunks(chunks, preview_rows=0):
+    """
+    Count rows and NULLs per column and infer SQL column types over a stream of
+    DataFrame chunks in a single pass, holding one chunk in memory at a time.
+    Returns (preview_df, row_count, null_counts, column_types), where preview_df
+    holds the first preview_rows rows with every column of the stream and
+    null_counts is a Series.
+    """
+    totals = {'rows': 0}
+    nulls = {}
+    head = []
+
+    def counted(chunks):
+        for chunk in chunks:
+            if totals['rows'] < preview_rows:
+                head.append(chunk.head(preview_rows - totals['rows']))
+            for col, count in chunk.isna().sum().items():
+                # A column first seen in a later chunk is NULL in all the rows before it
+                nulls[col] = nulls.get(col, totals['rows']) + int(count)
+            totals['rows'] += len(chunk)
+            yield chunk
+
+    column_types = infer_column_types(counted(chunks))
+    # Columns added by later chunks are NULL in the preview rows
+    preview_df = pd.concat(head) if head else pd.DataFrame()
+    preview_df = preview_df.reindex(columns=list(nulls))
+    return preview_df, totals['rows'], pd.Series(nulls, dtype='int64'), column_types
+
+def infer_column_types(chunks, column_type_map=None):
+    """
+    Infer SQL column types over a stream of DataFrame chunks.
+    Each chunk is analyzed with infer_dataframe_types and the results are widened
+    across chunks (BIGINT -> FLOAT -> NVARCHAR(MAX)), so only one chunk needs to
+    be in memory. Columns present in column_type_map are skipped. The whole stream
+    is consumed, since a later chunk may add columns (see iter_excel_chunks).
+    Returns a dict mapping column names to SQL types.
+    """
+    if column_type_map is None:
+        column_type_map = {}
+
+    types = {}
+    columns = None
+    for chunk in chunks:
+        if columns is None or len(chunk.columns) > len(columns):
+            columns = list(chunk.columns)
+        pending = [col for col in columns if col not in column_type_map and types.get(col) != "NVARCHAR(MAX)"]
+        if not pending:
+            # Every column is overridden or already as wide as it can get
+            continue
+        chunk_types = infer_dataframe_types(chunk, pending, skip_empty=True)
+        for col, col_type in chunk_types.items():
+            types[col] = _widen_type(types.get(col), col_type)
+
+    # Columns that were NULL in every chunk
+    for col in columns or []:
+        if col not in column_type_map and col not in types:
+            types[col] = "NVARCHAR(MAX)"
+    return types
+
+def get_excel_sheet_names(file_path):
+    """Return the sheet names of an .xlsx workbook without loading cell data"""
+    if XLSX_ENGINE == 'calamine':
+        with python_calamine.CalamineWorkbook.from_path(file_path) as workbook:
+            return list(workbook.sheet_names)
+    workbook = openpyxl.load_workbook(file_path, read_only=True)
+    try:
+        return list(workbook.sheetnames)
+    finally:
+        workbook.close()
+
+def _excel_cell_to_str(value):
+    """Convert an openpyxl or calamine cell value to the string pd.read_excel(dtype=str) produces"""
+    if value is None or value == '':
+        return pd.NA
+    if isinstance(value, datetime.date) and not isinstance(value, datetime.datetime):
+        # calamine returns date-only cells as dates; openpyxl and pandas use midnight datetimes
+        value = datetime.datetime(value.year, value.month, value.day)
+    if isinstance(value, float) and value.is_integer():
+        # pandas reads whole-number cells as integers
+        return str(int(value))
+    return str(value)
+
+def _trim_row(values):
+    """Drop trailing empty cells from a converted row"""
+    values = list(values)
+    while values and values[-1] is pd.NA:
+        values.pop()
+    return values
+
+def _excel_columns(header, width):
+    """Build width sanitized column names from the header row, matching pandas' naming of blank and duplicate headers"""
+    names = []
+    seen = {}
+    for i in range(width):
+        value = header[i] if i < len(header) else pd.NA
+        name = f"Unnamed: {i}" if value is pd.NA else value
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        names.append(name)
+    return [sanitize_name(name) for name in names]
+
+def _excel_chunk_frame(rows, header, columns):
+    """Build a DataFrame chunk, padding short rows with NULLs and adding columns for rows wider than columns"""
+    width = max([len(header), len(columns)] + [len(row) for row in rows])
+    if width > len(columns):
+        columns = _excel_columns(header, width)
+    for row in rows:
+        row.extend([pd.NA] * (width - len(row)))
+    return pd.DataFrame(rows, columns=columns, dtype=object)
+
+def _iter_xlsx_rows(file_path, sheet_name):
+    """Yield the raw cell values of an .xlsx sheet row by row, starting at column A, using XLSX_ENGINE"""
+    if XLSX_ENGINE == 'calamine':
+        with python_calamine.CalamineWorkbook.from_path(file_path) as workbook:
+            sheet = workbook.get_sheet_by_name(sheet_name)
+            # calamine rows start at the first used column; openpyxl's start at column A
+            padding = [None] * sheet.start[1] if sheet.start else []
+            for row in sheet.iter_rows():
+                yield padding + row
+        return
+
+    workbook = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        yield from workbook[sheet_name].iter_rows(values_only=True)
+    finally:
+        workbook.close()
+
+def iter_excel_chunks(file_path, sheet_name, chunk_size=CHUNK_SIZE):
+    """
+    Stream one .xlsx sheet as DataFrame chunks, read with calamine or openpyxl's
+    read-only mode (see XLSX_ENGINE).
+    Values are converted to strings the same way pd.read_excel(dtype=str) reads them and
+    column names are sanitized, so chunks can be typed and inserted like a fully
+    loaded sheet. A sheet with a header but no rows yields one empty chunk.
+    Columns are as wide as the header and the rows read so far: when a row further
+    down is wider, that chunk and the ones after it have extra columns at the end
+    (named like pandas' "Unnamed: N" columns), which are NULL in earlier chunks.
+
+    Args:
+        file_path: Path to the .xlsx file
+        sheet_name: Original (unsanitized) sheet name
+        chunk_size: Maximum number of rows per chunk
+    """
+    logger.debug(f"Streaming sheet '{sheet_name}' from {file_path} with {XLSX_ENGINE}")
+    source = _iter_xlsx_rows(file_path, sheet_name)
+    try:
+        rows = (_trim_row(_excel_cell_to_str(v) for v in row) for row in source)
+
+        header = next(rows, None)
+        if header is None:
+            logger.info(f"Sheet '{sheet_name}' is empty")
+            return
+
+        columns = []
+        chunk = []
+        blank_rows = 0
+        for row in rows:
+            # Like pandas, keep blank rows between data rows but drop trailing ones
+            if not row:
+                blank_rows += 1
+                continue
+            pending = [[] for _ in range(blank_rows)] + [row]
+            blank_rows = 0
+            for pending_row in pending:
+                chunk.append(pending_row)
+                if len(chunk) == chunk_size:
+                    frame = _excel_chunk_frame(chunk, header, columns)
+                    columns = list(frame.columns)
+                    yield frame
+                    chunk = []
+
+        if chunk or not columns:
+            yield _excel_chunk_frame(chunk, header, columns)
+    finally:
+        source.close()
+
+def iter_csv_chunks(file_path, delimiter=',', chunk_size=CHUNK_SIZE):
+    """
+    Stream a CSV file as DataFrame chunks of at most chunk_size rows.
+    All columns are read as strings, only empty values become NULL and column
+    names are sanitized.
+
+    Args:
+        file_path: Path to the CSV file
+        delimiter: Delimiter for CSV files (default: ',')
+        chunk_size: Maximum number of rows per chunk
+    """
+    logger.debug(f"Streaming CSV {file_path} (delimiter: '{delimiter}', chunk size: {chunk_size})")
+    reader = pd.read_csv(file_path, dtype=TEXT_DTYPE, keep_default_na=False, na_values=[''], delimiter=delimiter,
+                         chunksize=chunk_size)
+    columns = None
+    with reader:
+        for chunk in reader:
+            # Every chunk has the same header, so sanitize it once
+            if columns is None:
+                columns = [sanitize_name(col) for col in chunk.columns]
+            chunk.columns = columns
+            yield chunk
+
+def iter_prefetched(chunks, depth=1):
+    """
+    Iterate over chunks while a background thread reads up to depth chunks ahead.
+    Reading the next chunk from disk then overlaps with processing (e.g. inserting)
+    the current one. Exceptions raised by the reader are re-raised to the caller.
+    Closing the iterator early stops the reader thread and waits for it to close
+    the source.
+
+    Args:
+        chunks: Iterator of chunks to read ahead from
+        depth: Maximum number of chunks read ahead
+    """
+    buffer = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+    done = object()
+
+    def put(item):
+        # Block while the buffer is full, but give up once the consumer has stopped
+        while not stop.is_set():
+            try:
+                buffer.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def read_ahead():
         try:
-            max_val = max(int(float(str(v))) for v in non_null)
-            min_val = min(int(float(str(v))) for v in non_null)
-            if -9223372036854775808 <= min_val and max_val <= 9223372036854775807:
-                logger.debug(f"Column '{column_name}': Integer values detected, using BIGINT")
-                return "BIGINT"
-            else:
-                logger.debug(f"Column '{column_name}': Values exceed BIGINT range, using NVARCHAR(MAX)")
-                return "NVARCHAR(MAX)"
-        except:
-            logger.debug(f"Column '{column_name}': Error analyzing numeric range, using NVARCHAR(MAX)")
-            return "NVARCHAR(MAX)"
+            for chunk in chunks:
+                if not put((chunk, None)):
+                    return
+            put((done, None))
+        except Exception as e:
+            put((done, e))
+        finally:
+            if hasattr(chunks, 'close'):
+                chunks.close()
+
+    reader = threading.Thread(target=read_ahead, daemon=True)
+    reader.start()
+    try:
+        while True:
+            chunk, error = buffer.get()
+            if chunk is done:
+                if error is not None:
+                    raise error
+                return
+            yield chunk
+    finally:
+        stop.set()
+        reader.join()
+
+def spool_chunks(chunks, spool_path):
+    """
+    Yield chunks unchanged while also writing each one to spool_path, so the
+    stream can be read again with iter_spooled_chunks without parsing the source
+    file a second time.
+
+    Args:
+        chunks: Iterator of DataFrame chunks
+        spool_path: Path of the file to write (overwritten)
+    """
+    with open(spool_path, 'wb') as spool:
+        for chunk in chunks:
+            pickle.dump(chunk, spool, protocol=pickle.HIGHEST_PROTOCOL)
+            yield chunk
+
+def iter_spooled_chunks(spool_path, columns=None):
+    """
+    Read back the chunks written by spool_chunks, one at a time.
+
+    Args:
+        spool_path: Path of the spool file
+        columns: If set, chunks are reindexed to these columns (missing ones become NULL)
+    """
+    with open(spool_path, 'rb') as spool:
+        while True:
+            try:
+                chunk = pickle.load(spool)
+            except EOFError:
+                return
+            if columns is not None and list(chunk.columns) != columns:
+                chunk = chunk.reindex(columns=columns)
+            yield chunk
+
+def _iter_whole_sheet(file_path, sheet_name):
+    """Yield a whole .xls sheet as a single chunk (.xls has no streaming reader)"""
+    yield _read_excel_sheet(file_path, sheet_name)
+
+def get_sheet_sources(file_path, delimiter=','):
+    """
+    Return a dictionary {sheet_name: get_chunks} for loading a file into the database.
+    get_chunks(chunk_size=CHUNK_SIZE) returns a new iterator of DataFrame chunks each
+    time it is called. CSV files are streamed with pandas' chunked reader and .xlsx
+    sheets with iter_excel_chunks; .xls sheets are read whole and yielded as a single
+    chunk whatever the chunk_size.
+
+    Args:
+        file_path: Path to the file to read
+        delimiter: Delimiter for CSV files (default: ',')
+    """
+    if file_path.lower().endswith('.csv'):
+        return {'sheet1': lambda chunk_size=CHUNK_SIZE: iter_csv_chunks(file_path, delimiter, chunk_size)}
+
+    if file_path.lower().endswith('.xlsx'):
+        sheet_names = get_excel_sheet_names(file_path)
+        logger.info(f"Found {len(sheet_names)} sheet(s): {sheet_names}")
+        return {
+            sanitize_name(sheet_name): (lambda chunk_size=CHUNK_SIZE, sheet_name=sheet_name:
+                                        iter_excel_chunks(file_path, sheet_name, chunk_size))
+            for sheet_name in sheet_names
+        }
+
+    if file_path.lower().endswith('.xls'):
+        with pd.ExcelFile(file_path) as excel_file:
+            sheet_names = excel_file.sheet_names
+        logger.info(f"Found {len(sheet_names)} sheet(s): {sheet_names}")
+        return {
+            sanitize_name(sheet_name): (lambda chunk_size=CHUNK_SIZE, sheet_name=sheet_name:
+                                        _iter_whole_sheet(file_path, sheet_name))
+            for sheet_name in sheet_names
+        }
+
+    _, file_extension = os.path.splitext(file_path)
+    logger.error(f"Unsupported file type: {file_extension}")
+    raise ValueError(f"Unsupported file type: {file_extension}")
+
+def read_sheet_head(get_chunks, nrows):
+    """
+    Read the first nrows rows of a sheet from get_sheet_sources, parsing only the
+    start of the file (.xls sheets are still read whole). The columns are those of
+    the header and the rows read; a wider row further down is not seen.
+    Returns an empty DataFrame for an empty sheet.
+
+    Args:
+        get_chunks: Sheet source from get_sheet_sources
+        nrows: Number of data rows to read
+    """
+    with contextlib.closing(get_chunks(chunk_size=nrows)) as chunks:
+        head = next(chunks, None)
+    return head.head(nrows) if head is not None else pd.DataFrame()
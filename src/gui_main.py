@@ -7,13 +7,14 @@ from tkinter import filedialog, messagebox
 import customtkinter as ctk
 import threading
 import queue
+import concurrent.futures
 from datetime import datetime
 import os
 from PIL import ImageGrab
 import subprocess
 
-from src.database import get_db_connection, create_table_from_dataframe, get_available_connections
-from src.file_processor import get_dataframes
+from src.database import get_db_connection, get_connection_config, load_table_from_chunks, get_available_connections, release_connection, load_pyodbc
+from src.file_processor import get_sheet_sources
 from src.utils import sanitize_name, setup_logging, logger
 from src.dialogs import DataPreviewDialog, ConnectionManagerDialog
 
@@ -31,6 +32,11 @@ def get_version():
 
 VERSION = get_version()
 
+# Default number of sheets of one workbook loaded at the same time, each over its own
+# connection (overridable per connection with "max_parallel_sheets" in config.json).
+# Only 1 loads a workbook atomically; see _load_sheets_in_parallel.
+MAX_PARALLEL_SHEETS = 1
+
 
 class FileToDBGUI:
     def __init__(self, root):
@@ -42,6 +48,12 @@ class FileToDBGUI:
         # Message queue for thread-safe GUI updates
         self.message_queue = queue.Queue()
 
+        # Worker pool for short background jobs started from the GUI (see run_in_background)
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=2, thread_name_prefix="gui-worker")
+        # Connection tests get their own pool, so they never wait behind long jobs on the
+        # shared one (e.g. a preview analyzing a large sheet) while their timeout runs
+        self.connection_executor = concurrent.futures.ThreadPoolExecutor(max_workers=2, thread_name_prefix="connection-test")
+
         # Store column overrides: {file_path: {sheet_name: {'columns': {old_name: new_name}, 'types': {col_name: type}}}}
         self.column_overrides = {}
 
@@ -472,7 +484,7 @@ class FileToDBGUI:
         def test():
             try:
                 conn = get_db_connection(connection_name)
-                conn.close()
+                release_connection(conn)
                 self.message_queue.put(("log", f"Database connection '{connection_name}' successful!", "SUCCESS"))
                 self.message_queue.put(("status", "Connected", "green"))
                 self.message_queue.put(("db_status", "Status: Connected", "green"))
@@ -481,7 +493,7 @@ class FileToDBGUI:
                 self.message_queue.put(("status", "Connection failed", "red"))
                 self.message_queue.put(("db_status", "Status: Connection failed", "red"))
 
-        threading.Thread(target=test, daemon=True).start()
+        self.connection_executor.submit(test)
 
     def start_conversion(self):
         """Start the batch conversion process in a separate thread"""
@@ -515,15 +527,22 @@ class FileToDBGUI:
         self.update_status("Converting...", "blue")
         self.log_message(f"Starting batch conversion of {len(self.file_queue)} file(s) using connection '{connection_name}'...")
 
-        # Start batch conversion in background thread
+        # Start batch conversion in background thread. Queue editing buttons are
+        # disabled until the worker finishes, so an immutable snapshot is enough.
         threading.Thread(
             target=self.convert_batch,
-            args=(self.file_queue.copy(), connection_name),
+            args=(tuple(self.file_queue), connection_name),
             daemon=True
         ).start()
 
     def convert_batch(self, file_list, connection_name):
-        """Convert multiple files to database tables (runs in background thread)"""
+        """
+        Convert multiple files to database tables (runs in background thread)
+
+        Args:
+            file_list: Sequence of file paths to convert (list or tuple)
+            connection_name: Name of the connection to use from config.json
+        """
         total_files = len(file_list)
         successful_files = 0
         failed_files = []
@@ -532,61 +551,96 @@ class FileToDBGUI:
             # Connect to database once for all files
             self.message_queue.put(("log", f"Connecting to database using '{connection_name}'...", "INFO"))
             conn = get_db_connection(connection_name)
-            cursor = conn.cursor()
-
-            for file_index, file_path in enumerate(file_list, 1):
-                try:
-                    filename = os.path.basename(file_path)
-                    self.message_queue.put(("log", f"\n[{file_index}/{total_files}] Processing: {filename}", "INFO"))
-
-                    # Calculate progress for this file (each file gets equal portion)
-                    file_progress_start = int(((file_index - 1) / total_files) * 100)
-                    file_progress_range = int(100 / total_files)
-
-                    # Read file
-                    self.message_queue.put(("progress", file_progress_start + int(file_progress_range * 0.1)))
-                    # Get delimiter preference for CSV files
-                    delimiter = self.csv_delimiters.get(file_path, ',')
-                    dataframes = get_dataframes(file_path, delimiter=delimiter)
-                    self.message_queue.put(("log", f"  Found {len(dataframes)} sheet(s)", "INFO"))
-
-                    # Process each sheet
-                    base_table_name = sanitize_name(os.path.splitext(filename)[0])
-                    total_sheets = len(dataframes)
-
-                    for idx, (sheet_name, df) in enumerate(dataframes.items()):
-                        if len(dataframes) == 1:
-                            table_name = base_table_name
+            cursor = None
+            try:
+                # Each file is loaded inside one explicit transaction
+                conn.autocommit = False
+                cursor = conn.cursor()
+                # Optional per-connection load settings: a directory shared with SQL Server
+                # for BULK INSERT staging, opting out of fast_executemany for drivers that
+                # don't support array binding, and how many sheets to load at once
+                db_config = get_connection_config(connection_name)
+                load_options = {
+                    'stage_dir': db_config.get('bulk_stage_dir'),
+                    'fast_executemany': db_config.get('fast_executemany', True),
+                }
+                max_parallel_sheets = db_config.get('max_parallel_sheets', MAX_PARALLEL_SHEETS)
+
+                for file_index, file_path in enumerate(file_list, 1):
+                    try:
+                        filename = os.path.basename(file_path)
+                        self.message_queue.put(("log", f"\n[{file_index}/{total_files}] Processing: {filename}", "INFO"))
+
+                        # Calculate progress for this file (each file gets equal portion)
+                        file_progress_start = int(((file_index - 1) / total_files) * 100)
+                        file_progress_range = int(100 / total_files)
+
+                        # Read file
+                        self.message_queue.put(("progress", file_progress_start + int(file_progress_range * 0.1)))
+                        # Get delimiter preference for CSV files
+                        delimiter = self.csv_delimiters.get(file_path, ',')
+                        sheet_sources = get_sheet_sources(file_path, delimiter=delimiter)
+                        # CSV files are cheap to parse again for the insert pass; Excel sheets are spooled
+                        file_load_options = dict(load_options, spool=not file_path.lower().endswith('.csv'))
+                        self.message_queue.put(("log", f"  Found {len(sheet_sources)} sheet(s)", "INFO"))
+
+                        # Process each sheet
+                        base_table_name = sanitize_name(os.path.splitext(filename)[0])
+                        total_sheets = len(sheet_sources)
+                        sheet_jobs = []
+
+                        for sheet_name, get_chunks in sheet_sources.items():
+                            if len(sheet_sources) == 1:
+                                table_name = base_table_name
+                            else:
+                                table_name = f"{base_table_name}_{sheet_name}"
+
+                            # Get column overrides for this file and sheet
+                            sheet_overrides = self.column_overrides.get(file_path, {}).get(sheet_name, {})
+                            column_name_map = sheet_overrides.get('columns', {})
+                            column_type_map = sheet_overrides.get('types', {})
+
+                            if column_name_map:
+                                self.message_queue.put(("log", f"  Applying {len(column_name_map)} column name override(s)", "INFO"))
+                            if column_type_map:
+                                self.message_queue.put(("log", f"  Applying {len(column_type_map)} column type override(s)", "INFO"))
+
+                            sheet_jobs.append((table_name, get_chunks, column_name_map, column_type_map))
+
+                        def sheet_done(sheets_done):
+                            # Update progress within this file
+                            sheet_progress = int(file_progress_range * (0.2 + 0.7 * sheets_done / total_sheets))
+                            self.message_queue.put(("progress", file_progress_start + sheet_progress))
+
+                        if total_sheets > 1 and max_parallel_sheets > 1:
+                            self._load_sheets_in_parallel(sheet_jobs, connection_name, file_load_options,
+                                                          max_parallel_sheets, sheet_done)
                         else:
-                            table_name = f"{base_table_name}_{sheet_name}"
-
-                        # Get column overrides for this file and sheet
-                        sheet_overrides = self.column_overrides.get(file_path, {}).get(sheet_name, {})
-                        column_name_map = sheet_overrides.get('columns', {})
-                        column_type_map = sheet_overrides.get('types', {})
-
-                        if column_name_map:
-                            self.message_queue.put(("log", f"  Applying {len(column_name_map)} column name override(s)", "INFO"))
-                        if column_type_map:
-                            self.message_queue.put(("log", f"  Applying {len(column_type_map)} column type override(s)", "INFO"))
-
-                        self.message_queue.put(("log", f"  Creating table: {table_name}", "INFO"))
-                        create_table_from_dataframe(df, table_name, cursor, column_name_map, column_type_map)
-
-                        # Update progress within this file
-                        sheet_progress = int(file_progress_range * (0.2 + 0.7 * (idx + 1) / total_sheets))
-                        self.message_queue.put(("progress", file_progress_start + sheet_progress))
-
-                    self.message_queue.put(("log", f"  [SUCCESS] {filename} completed successfully", "SUCCESS"))
-                    successful_files += 1
-
-                except Exception as e:
-                    self.message_queue.put(("log", f"  [ERROR] Failed to process {filename}: {e}", "ERROR"))
-                    failed_files.append((filename, str(e)))
-                    # Continue with next file
-
-            cursor.close()
-            conn.close()
+                            for idx, (table_name, get_chunks, column_name_map, column_type_map) in enumerate(sheet_jobs):
+                                self.message_queue.put(("log", f"  Creating table: {table_name}", "INFO"))
+                                load_table_from_chunks(get_chunks, table_name, cursor, column_name_map, column_type_map,
+                                                       **file_load_options)
+                                sheet_done(idx + 1)
+                            conn.commit()
+                        self.message_queue.put(("log", f"  [SUCCESS] {filename} completed successfully", "SUCCESS"))
+                        successful_files += 1
+
+                    except Exception as e:
+                        try:
+                            conn.rollback()
+                        except load_pyodbc().Error as rollback_error:
+                            # e.g. the connection dropped; report it and go on with the next file
+                            self.message_queue.put(("log", f"  [ERROR] Rollback failed for {filename}: {rollback_error}", "ERROR"))
+                        self.message_queue.put(("log", f"  [ERROR] Failed to process {filename}: {e}", "ERROR"))
+                        failed_files.append((filename, str(e)))
+                        # Continue with next file
+            finally:
+                # Hand the connection back even when an error escapes the file loop
+                try:
+                    if cursor is not None:
+                        cursor.close()
+                finally:
+                    release_connection(conn)
 
             # Final summary
             self.message_queue.put(("progress", 100))
@@ -619,64 +673,101 @@ class FileToDBGUI:
             self.message_queue.put(("enable_buttons", None))
             self.message_queue.put(("show_error", f"Batch conversion failed: {str(e)}"))
 
-    def convert_file(self, file_path, connection_name):
-        """Convert file to database tables (runs in background thread) - Legacy single file method"""
-        try:
-            # Read file
-            self.message_queue.put(("log", f"Reading file: {file_path}", "INFO"))
-            self.message_queue.put(("progress", 10))
-
-            # Get delimiter preference for CSV files
-            delimiter = self.csv_delimiters.get(file_path, ',')
-            dataframes = get_dataframes(file_path, delimiter=delimiter)
-            self.message_queue.put(("log", f"Found {len(dataframes)} sheet(s)", "INFO"))
-            self.message_queue.put(("progress", 20))
-
-            # Connect to database
-            self.message_queue.put(("log", f"Connecting to database using '{connection_name}'...", "INFO"))
+    def _load_sheets_in_parallel(self, sheet_jobs, connection_name, load_options, max_workers, sheet_done):
+        """
+        Load several sheets at the same time, each over its own connection (runs in background thread)
+
+        Every sheet is loaded in its own transaction, and the transactions are only
+        committed once all sheets have loaded. On the first failure, queued sheets are
+        not started, running ones stop at their next chunk, every sheet is rolled back
+        and the error is raised. The commits themselves are not atomic: if one fails,
+        the sheets committed before it stay loaded, and the error names them. Use
+        max_parallel_sheets = 1 when a workbook must load as a whole.
+
+        Args:
+            sheet_jobs: List of (table_name, get_chunks, column_name_map, column_type_map)
+            connection_name: Name of the connection to use from config.json
+            load_options: Extra keyword arguments for load_table_from_chunks
+            max_workers: Maximum number of sheets loaded at once
+            sheet_done: Called with the number of finished sheets after each one completes
+        """
+        # Sheets that loaded and wait for their commit, with their connections
+        loaded = []
+        loaded_lock = threading.Lock()
+        cancelled = threading.Event()
+
+        def load_sheet(table_name, get_chunks, column_name_map, column_type_map):
+            def get_cancellable_chunks(*args, **kwargs):
+                for chunk in get_chunks(*args, **kwargs):
+                    if cancelled.is_set():
+                        raise RuntimeError(f"Load of table '{table_name}' stopped because another sheet failed")
+                    yield chunk
+
+            # pyodbc connections must not be shared between threads, so each sheet gets its own
             conn = get_db_connection(connection_name)
-            cursor = conn.cursor()
-            self.message_queue.put(("progress", 30))
-
-            # Process each sheet
-            base_table_name = sanitize_name(os.path.splitext(os.path.basename(file_path))[0])
-            total_sheets = len(dataframes)
-            progress_per_sheet = 60 / total_sheets
-
-            for idx, (sheet_name, df) in enumerate(dataframes.items()):
-                if len(dataframes) == 1:
-                    table_name = base_table_name
-                else:
-                    table_name = f"{base_table_name}_{sheet_name}"
-
-                # Get column overrides for this file and sheet
-                sheet_overrides = self.column_overrides.get(file_path, {}).get(sheet_name, {})
-                column_name_map = sheet_overrides.get('columns', {})
-                column_type_map = sheet_overrides.get('types', {})
-
-                self.message_queue.put(("log", f"Processing sheet: {sheet_name} → table: {table_name}", "INFO"))
-
-                create_table_from_dataframe(df, table_name, cursor, column_name_map, column_type_map)
-
-                self.message_queue.put(("log", f"[SUCCESS] Table '{table_name}' created successfully", "SUCCESS"))
-                current_progress = int(30 + ((idx + 1) * progress_per_sheet))
-                self.message_queue.put(("progress", current_progress))
-
-            cursor.close()
-            conn.close()
-
-            self.message_queue.put(("progress", 100))
-            self.message_queue.put(("log", f"[SUCCESS] All {total_sheets} table(s) created successfully!", "SUCCESS"))
-            self.message_queue.put(("status", "Conversion completed!", "green"))
-            self.message_queue.put(("enable_buttons", None))
-            self.message_queue.put(("show_success", f"Successfully created {total_sheets} table(s)!"))
+            try:
+                conn.autocommit = False
+                self.message_queue.put(("log", f"  Creating table: {table_name}", "INFO"))
+                load_table_from_chunks(get_cancellable_chunks, table_name, conn.cursor(), column_name_map,
+                                       column_type_map, **load_options)
+            except Exception:
+                # release_connection rolls the sheet back
+                release_connection(conn)
+                raise
+            with loaded_lock:
+                loaded.append((table_name, conn))
+
+        pool = concurrent.futures.ThreadPoolExecutor(max_workers=min(max_workers, len(sheet_jobs)))
+        futures = [pool.submit(load_sheet, *job) for job in sheet_jobs]
+        try:
+            for sheets_done, future in enumerate(concurrent.futures.as_completed(futures), 1):
+                future.result()
+                sheet_done(sheets_done)
+        except BaseException:
+            # Drop queued sheets and wait only for running ones to reach their next
+            # chunk, where they stop and roll back
+            cancelled.set()
+            pool.shutdown(wait=True, cancel_futures=True)
+            for _, conn in loaded:
+                try:
+                    release_connection(conn)
+                except Exception:
+                    pass
+            raise
+        pool.shutdown()
 
-        except Exception as e:
-            self.message_queue.put(("log", f"Error: {e}", "ERROR"))
-            self.message_queue.put(("status", "Conversion failed", "red"))
-            self.message_queue.put(("progress", 0))
-            self.message_queue.put(("enable_buttons", None))
-            self.message_queue.put(("show_error", str(e)))
+        committed = []
+        try:
+            for table_name, conn in loaded:
+                try:
+                    conn.commit()
+                except Exception as e:
+                    if committed:
+                        raise RuntimeError(f"Commit of table '{table_name}' failed after {', '.join(committed)} "
+                                           f"had already been committed: {e}") from e
+                    raise
+                committed.append(table_name)
+        finally:
+            # Releasing rolls back the sheets that were not committed
+            for _, conn in loaded:
+                try:
+                    release_connection(conn)
+                except Exception:
+                    pass
+
+    def run_in_background(self, func, callback, *args, executor=None):
+        """
+        Run func(*args) on the worker pool and call callback(future) on the Tk main thread when done
+
+        Args:
+            func: Function to run in a worker thread (must not touch widgets)
+            callback: Called with the finished Future from process_queue
+            *args: Arguments passed to func
+            executor: Pool to run func on (default: the shared worker pool)
+        """
+        future = (executor or self.executor).submit(func, *args)
+        future.add_done_callback(lambda f: self.message_queue.put(("callback", (callback, f))))
+        return future
 
     def process_queue(self):
         """Process messages from background thread"""
@@ -728,6 +819,14 @@ class FileToDBGUI:
                 elif msg_type == "show_error":
                     messagebox.showerror("Error", msg_data)
 
+                elif msg_type == "callback":
+                    # ("callback", (callback, future)) from run_in_background
+                    callback, future = msg_data
+                    try:
+                        callback(future)
+                    except Exception as e:
+                        self.log_message(f"Background task callback failed: {e}", "ERROR")
+
         except queue.Empty:
             pass
 
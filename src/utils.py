@@ -4,6 +4,7 @@ Utility functions for file to database converter
 
 import os
 import re
+import functools
 import logging
 from datetime import datetime
 from cryptography.fernet import Fernet
@@ -47,6 +48,7 @@ def setup_logging():
 logger = setup_logging()
 
 # Encryption key management
+@functools.lru_cache(maxsize=1)
 def get_or_create_key():
     """Get or create encryption key for password storage"""
     key_file = '.encryption_key'
@@ -60,22 +62,35 @@ def get_or_create_key():
         logger.info("Generated new encryption key")
     return key
 
+# Fernet instance built from the key on first use (reset to None to reload the key)
+_FERNET = None
+
+def _get_fernet():
+    """Return the shared Fernet instance, creating it on first use"""
+    global _FERNET
+    if _FERNET is None:
+        _FERNET = Fernet(get_or_create_key())
+    return _FERNET
+
 def encrypt_password(password):
     """Encrypt password using Fernet symmetric encryption"""
     if not password:
         return ""
-    key = get_or_create_key()
-    f = Fernet(key)
+    f = _get_fernet()
     encrypted = f.encrypt(password.encode())
     return base64.urlsafe_b64encode(encrypted).decode()
 
+@functools.lru_cache(maxsize=64)
 def decrypt_password(encrypted_password):
-    """Decrypt password using Fernet symmetric encryption"""
+    """
+    Decrypt password using Fernet symmetric encryption.
+    Results are memoized per ciphertext, so reconnecting or re-selecting a
+    connection doesn't verify and decrypt the same token again.
+    """
     if not encrypted_password:
         return ""
     try:
-        key = get_or_create_key()
-        f = Fernet(key)
+        f = _get_fernet()
         decoded = base64.urlsafe_b64decode(encrypted_password.encode())
         decrypted = f.decrypt(decoded)
         return decrypted.decode()
@@ -84,22 +99,19 @@ def decrypt_password(encrypted_password):
         # If decryption fails, assume it's plain text (backward compatibility)
         return encrypted_password
 
-def sanitize_name(name):
-    """
-    Sanitize table and column names:
-    - Convert to lowercase
-    - Remove special characters (keep only alphanumeric and underscores)
-    - Replace whitespace with underscores
-    - Remove leading/trailing underscores
-    - Ensure it doesn't start with a number
-    """
-    original_name = name
+# Patterns used by sanitize_name, compiled once
+_WHITESPACE_RE = re.compile(r'\s+')
+_INVALID_CHARS_RE = re.compile(r'[^a-z0-9_]')
+
+@functools.lru_cache(maxsize=4096)
+def _sanitize_name_cached(name):
+    """Pure part of sanitize_name, memoized since the same headers recur across sheets and files"""
     # Convert to lowercase
     name = name.lower()
     # Replace whitespace with underscores
-    name = re.sub(r'\s+', '_', name)
+    name = _WHITESPACE_RE.sub('_', name)
     # Remove special characters, keep only alphanumeric and underscores
-    name = re.sub(r'[^a-z0-9_]', '', name)
+    name = _INVALID_CHARS_RE.sub('', name)
     # Remove leading/trailing underscores
     name = name.strip('_')
     # Ensure it doesn't start with a number
@@ -108,8 +120,19 @@ def sanitize_name(name):
     # Ensure it's not empty
     if not name:
         name = 'unnamed'
-
-    if original_name != name:
-        logger.debug(f"Sanitized name: '{original_name}' -> '{name}'")
-
     return name
+
+def sanitize_name(name):
+    """
+    Sanitize table and column names:
+    - Convert to lowercase
+    - Remove special characters (keep only alphanumeric and underscores)
+    - Replace whitespace with underscores
+    - Remove leading/trailing underscores
+    - Ensure it doesn't start with a number
+    """
+    sanitized = _sanitize_name_cached(name)
+    # Called for every column name, so skip the comparison and message unless debug logging is on
+    if logger.isEnabledFor(logging.DEBUG) and sanitized != name:
+        logger.debug(f"Sanitized name: '{name}' -> '{sanitized}'")
+    return sanitized